@@ -2,15 +2,67 @@
 ASGI config for core project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Besides the Django application it serves STOCK_EVENTS_PATH, a Server-Sent Events
+stream of stock quantity changes (see inventory/events.py).
 
 For more information on this file, see
 https://docs.djangoproject.com/en/3.0/howto/deployment/asgi/
 """
 
+import asyncio
 import os
 
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from inventory.events import broker, format_event                      # noqa: E402  needs the apps loaded first
+
+
+STOCK_EVENTS_PATH = '/events/stock/'
+KEEPALIVE_SECONDS = 15                                                  # comment lines keep proxies from closing an idle stream
+
+
+async def stock_events(scope, receive, send):
+    """Streams every stock movement of this process as 'event: stock' until the client disconnects"""
+    subscription = broker.subscribe()
+    await send({
+        'type': 'http.response.start',
+        'status': 200,
+        'headers': [
+            (b'content-type', b'text/event-stream'),
+            (b'cache-control', b'no-cache'),
+            (b'x-accel-buffering', b'no'),
+        ],
+    })
+    await send({'type': 'http.response.body', 'body': b'retry: 3000\n\n', 'more_body': True})
+
+    async def wait_for_disconnect():
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+
+    disconnected = asyncio.ensure_future(wait_for_disconnect())
+    try:
+        while not disconnected.done():
+            next_event = asyncio.ensure_future(subscription.get())
+            done, _ = await asyncio.wait({next_event, disconnected}, timeout=KEEPALIVE_SECONDS, return_when=asyncio.FIRST_COMPLETED)
+            if next_event in done:
+                body = format_event(next_event.result())
+            else:
+                next_event.cancel()
+                if disconnected in done:
+                    break
+                body = b': keepalive\n\n'
+            await send({'type': 'http.response.body', 'body': body, 'more_body': True})
+    finally:
+        broker.unsubscribe(subscription)
+        disconnected.cancel()
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'http' and scope['path'] == STOCK_EVENTS_PATH and scope['method'] == 'GET':
+        await stock_events(scope, receive, send)
+    else:
+        await django_application(scope, receive, send)
@@ -0,0 +1,75 @@
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+
+
+# set while a view decorated with use_replica runs
+_reading_from_replica = ContextVar('reading_from_replica', default=False)
+# set by the router when the current request writes, so the client is pinned to the primary for a while
+_wrote = ContextVar('wrote', default=False)
+
+PIN_COOKIE = 'primary_pin'
+
+
+def replica_alias():
+    """Alias of the read replica, or None when settings.REPLICA_DATABASE is not one of DATABASES"""
+    alias = getattr(settings, 'REPLICA_DATABASE', None)
+    return alias if alias in settings.DATABASES else None
+
+
+class PrimaryReplicaRouter:
+    """Reads of views decorated with use_replica go to the replica, everything else to the primary ('default')"""
+
+    def db_for_read(self, model, **hints):
+        if _reading_from_replica.get():
+            return replica_alias()
+        return None
+
+    def db_for_write(self, model, **hints):
+        _wrote.set(True)
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True                                                     # the replica holds the same rows as the primary
+
+
+def use_replica(view):
+    """
+    Serves GET/HEAD requests of a read-only view from the replica. Clients that wrote something in the last
+    settings.REPLICA_PIN_SECONDS stay on the primary, so a page reached right after a write never shows
+    replication lag. TemplateResponses are rendered before returning, their queries belong to the view.
+    """
+    @wraps(view)
+    def wrapped(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD') or PIN_COOKIE in request.COOKIES or replica_alias() is None:
+            return view(request, *args, **kwargs)
+        token = _reading_from_replica.set(True)
+        try:
+            response = view(request, *args, **kwargs)
+            if callable(getattr(response, 'render', None)) and not response.is_rendered:
+                response.render()
+            return response
+        finally:
+            _reading_from_replica.reset(token)
+    return wrapped
+
+
+class PrimaryPinMiddleware:
+    """Sets the pin cookie that use_replica checks on responses to requests that wrote to the database"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = _wrote.set(False)
+        try:
+            response = self.get_response(request)
+            wrote = _wrote.get()
+        finally:
+            _wrote.reset(token)
+        if wrote and replica_alias() is not None:
+            response.set_cookie(
+                PIN_COOKIE, '1', max_age=getattr(settings, 'REPLICA_PIN_SECONDS', 5), httponly=True, samesite='Lax'
+            )
+        return response
@@ -0,0 +1,116 @@
+import logging
+import os
+import time
+import traceback
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+
+logger = logging.getLogger('core.sql')
+
+SLOW_QUERY_MS = 100                                                     # default for settings.SQL_SLOW_QUERY_MS
+DUPLICATE_GROUPS_LOGGED = 5
+
+
+class QueryRecorder:
+    """execute_wrapper that counts and times every query and logs the slow ones with their SQL, and optionally a stack trace"""
+
+    def __init__(self, alias, slow_ms, with_stack=False):
+        self.alias = alias
+        self.slow_ms = slow_ms
+        self.with_stack = with_stack
+        self.count = 0
+        self.seconds = 0.0
+        self.statements = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.count += 1
+            self.seconds += elapsed
+            self.statements[sql] += 1                                   # the SQL still has placeholders, so equal shapes group together
+            if elapsed * 1000 >= self.slow_ms:
+                stack = ''.join(_project_stack()) if self.with_stack else ''
+                logger.warning("slow query %.1fms on %s\n%s\nparams: %r\n%s", elapsed * 1000, self.alias, sql, params, stack)
+
+
+def _project_stack():
+    # only the frames of this project, Django's own frames are the same for every query
+    return traceback.format_list(
+        frame for frame in traceback.extract_stack()[:-2]
+        if frame.filename.startswith(settings.BASE_DIR) and frame.filename != __file__
+        and os.sep + 'site-packages' + os.sep not in frame.filename
+    )
+
+
+class SQLProfilingMiddleware:
+    """
+    Records query count, DB time, repeated statements and template render time of every request.
+    The figures go to a Server-Timing header and, at DEBUG level, to the 'core.sql' logger; queries slower
+    than settings.SQL_SLOW_QUERY_MS are logged in full as warnings, with the project frames that ran them when
+    settings.SQL_SLOW_QUERY_STACK is set. Enabled by settings.SQL_PROFILING.
+    Render time is measured by the core.template_backends.ProfilingDjangoTemplates backend.
+
+    Queries made while a streaming response is consumed happen after the middleware returns and are not counted.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = getattr(settings, 'SQL_PROFILING', settings.DEBUG)
+        self.slow_ms = getattr(settings, 'SQL_SLOW_QUERY_MS', SLOW_QUERY_MS)
+        self.with_stack = getattr(settings, 'SQL_SLOW_QUERY_STACK', False)
+
+    def __call__(self, request):
+        if not self.enabled:
+            return self.get_response(request)
+
+        recorders = [QueryRecorder(alias, self.slow_ms, self.with_stack) for alias in connections]
+        request._render_seconds = None                                  # added up by core.template_backends.TimedTemplate
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for recorder in recorders:
+                stack.enter_context(connections[recorder.alias].execute_wrapper(recorder))
+            response = self.get_response(request)
+        total = time.perf_counter() - started
+
+        self.report(request, response, recorders, total)
+        return response
+
+    def report(self, request, response, recorders, total):
+        count = sum(recorder.count for recorder in recorders)
+        db_seconds = sum(recorder.seconds for recorder in recorders)
+        statements = Counter()
+        for recorder in recorders:
+            statements.update(recorder.statements)
+        duplicates = [(sql, times) for sql, times in statements.most_common() if times > 1]
+
+        timings = [f'db;dur={db_seconds * 1000:.1f};desc="{count} queries"']
+        if request._render_seconds is not None:
+            timings.append(f'render;dur={request._render_seconds * 1000:.1f}')
+        timings.append(f'total;dur={total * 1000:.1f}')
+        response['Server-Timing'] = ', '.join(timings)
+
+        profile = {
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'queries': count,
+            'db_ms': round(db_seconds * 1000, 1),
+            'render_ms': round(request._render_seconds * 1000, 1) if request._render_seconds is not None else None,
+            'total_ms': round(total * 1000, 1),
+            'duplicate_groups': len(duplicates),
+            'duplicate_queries': sum(times for _, times in duplicates),
+        }
+        logger.debug(
+            "%(method)s %(path)s %(status)s queries=%(queries)s db_ms=%(db_ms)s render_ms=%(render_ms)s "
+            "total_ms=%(total_ms)s duplicate_groups=%(duplicate_groups)s", profile,
+            extra={'profile': profile},
+        )
+        for sql, times in duplicates[:DUPLICATE_GROUPS_LOGGED]:
+            logger.debug("repeated %d times on %s: %s", times, request.path, sql)
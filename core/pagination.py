@@ -0,0 +1,171 @@
+import base64
+import binascii
+import datetime
+import json
+
+from django.core.exceptions import FieldDoesNotExist, FieldError, ValidationError
+from django.db.models import Q
+
+
+# query parameters that select a page; every other parameter (e.g. a search) is kept in the links
+AFTER_PARAM = 'after'
+BEFORE_PARAM = 'before'
+LAST_PARAM = 'last'
+
+
+def encode_cursor(values):
+    values = [value.isoformat() if isinstance(value, (datetime.date, datetime.datetime)) else value for value in values]
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip('=')
+
+
+def decode_cursor(token, fields):
+    """
+    List of key values from a cursor token, each converted with the to_python() of its model field in 'fields'
+    (None: kept as is). None if it is not a cursor of those keys, so a tampered link falls back to the first page.
+    """
+    try:
+        values = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+    except (binascii.Error, ValueError):
+        return None
+    if not isinstance(values, list) or len(values) != len(fields):
+        return None
+    try:
+        values = [value if field is None else field.to_python(value) for field, value in zip(fields, values)]
+    except (ValidationError, ValueError, TypeError):
+        return None
+    if any(value is None or isinstance(value, (list, dict)) for value in values):
+        return None
+    return values
+
+
+class KeysetPage:
+    """One page of a KeysetPaginator, with the query strings of the links around it"""
+
+    def __init__(self, object_list, has_previous, has_next, paginator, params, is_first=False):
+        self.object_list = object_list
+        self._has_previous = has_previous and bool(object_list)
+        self._has_next = has_next and bool(object_list)
+        self.is_first = is_first
+        self.paginator = paginator
+        self.params = params
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_next(self):
+        return self._has_next
+
+    def has_other_pages(self):
+        return not self.is_first or self._has_previous or self._has_next
+
+    def _query(self, **page):
+        params = self.params.copy()
+        for key in (AFTER_PARAM, BEFORE_PARAM, LAST_PARAM, 'page'):
+            params.pop(key, None)
+        params.update(page)
+        return params.urlencode()
+
+    def first_query(self):
+        return self._query()
+
+    def last_query(self):
+        return self._query(**{LAST_PARAM: '1'})
+
+    def next_query(self):
+        return self._query(**{AFTER_PARAM: self.paginator.cursor(self.object_list[-1])})
+
+    def previous_query(self):
+        return self._query(**{BEFORE_PARAM: self.paginator.cursor(self.object_list[0])})
+
+
+class KeysetPaginator:
+    """
+    Cursor pagination over a unique ordering such as ('-time', '-billno') or ('name', 'id').
+    A page is read with WHERE (keys) > (cursor) ORDER BY keys LIMIT per_page + 1, so there is no COUNT
+    and no OFFSET and a deep page costs the same as the first one (given an index on the keys).
+    The last key has to be unique. Keys may be annotations of the queryset.
+    """
+
+    def __init__(self, queryset, ordering, per_page):
+        self.queryset = queryset
+        self.ordering = list(ordering)
+        self.per_page = per_page
+        self.fields = [key.lstrip('-') for key in self.ordering]
+
+    def key_fields(self):
+        """Model field (or annotation output field) of each key, None where it cannot be resolved"""
+        fields = []
+        for name in self.fields:
+            try:
+                annotation = self.queryset.query.annotations.get(name)
+                fields.append(annotation.output_field if annotation is not None else self.queryset.model._meta.get_field(name))
+            except (FieldDoesNotExist, FieldError):
+                fields.append(None)
+        return fields
+
+    def cursor(self, obj):
+        return encode_cursor([getattr(obj, field) for field in self.fields])
+
+    def _seek(self, values, forward):
+        # (a, b, c) after (x, y, z): a > x, or a = x and b > y, or a = x and b = y and c > z;
+        # the extra a >= x lets the database start from the cursor in the index instead of filtering from the top
+        condition = Q()
+        lookups = []
+        for position, key in enumerate(self.ordering):
+            descending = key.startswith('-')
+            lookups.append('lt' if descending == forward else 'gt')
+            step = Q(**{f'{self.fields[position]}__{lookups[position]}': values[position]})
+            for field, value in zip(self.fields[:position], values[:position]):
+                step &= Q(**{field: value})
+            condition |= step
+        return Q(**{f'{self.fields[0]}__{lookups[0]}e': values[0]}) & condition
+
+    def _reversed_ordering(self):
+        return [key[1:] if key.startswith('-') else '-' + key for key in self.ordering]
+
+    def rows_after(self, values=None):
+        """Queryset of the rows following the cursor 'values' (all rows without one), in page order"""
+        queryset = self.queryset.order_by(*self.ordering)
+        return queryset.filter(self._seek(values, forward=True)) if values is not None else queryset
+
+    def rows_before(self, values=None):
+        """Queryset of the rows preceding the cursor 'values' (all rows without one), nearest first"""
+        queryset = self.queryset.order_by(*self._reversed_ordering())
+        return queryset.filter(self._seek(values, forward=False)) if values is not None else queryset
+
+    def page(self, params):
+        """Page selected by ?after= / ?before= / ?last= in the 'params' QueryDict, the first page otherwise"""
+        after = decode_cursor(params[AFTER_PARAM], self.key_fields()) if params.get(AFTER_PARAM) else None
+        before = decode_cursor(params[BEFORE_PARAM], self.key_fields()) if params.get(BEFORE_PARAM) else None
+        size = self.per_page
+
+        if before is not None or (after is None and params.get(LAST_PARAM)):
+            rows = list(self.rows_before(before)[:size + 1])
+            has_previous = len(rows) > size
+            rows = rows[:size][::-1]
+            return KeysetPage(rows, has_previous, before is not None, self, params)
+
+        rows = list(self.rows_after(after)[:size + 1])
+        return KeysetPage(rows[:size], after is not None, len(rows) > size, self, params, is_first=after is None)
+
+
+class KeysetPaginationMixin:
+    """
+    ListView mixin that pages with KeysetPaginator on 'keyset_ordering' instead of page numbers.
+    Templates get page_obj / is_paginated as usual; include "pagination.html" for the links.
+    """
+    keyset_ordering = None
+
+    def get_keyset_ordering(self, queryset):
+        return self.keyset_ordering
+
+    def paginate_queryset(self, queryset, page_size):
+        paginator = KeysetPaginator(queryset, self.get_keyset_ordering(queryset), page_size)
+        page = paginator.page(self.request.GET)
+        return paginator, page, page.object_list, page.has_other_pages()
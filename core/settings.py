@@ -4,6 +4,7 @@ Clean version: English only, no /en/ prefix
 """
 
 import os
+import sys
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
@@ -43,6 +44,8 @@ EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 # Middleware
 # -------------------------------------------------------------------
 MIDDLEWARE = [
+    'core.middleware.SQLProfilingMiddleware',
+    'core.db_routers.PrimaryPinMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -53,11 +56,18 @@ MIDDLEWARE = [
     # ⚠️ Notice: NO LocaleMiddleware here
 ]
 
+# per-request query count / DB time in the Server-Timing header, full SQL for slow queries in the log;
+# on in development only, and not for the test client requests of management commands (tests, benchmarks).
+# Set the 'core.sql' logger to DEBUG for a summary line per request
+SQL_PROFILING = DEBUG and (os.path.basename(sys.argv[0]) != 'manage.py' or sys.argv[1:2] == ['runserver'])
+SQL_SLOW_QUERY_MS = 100
+SQL_SLOW_QUERY_STACK = False                                     # add the project frames that ran each slow query
+
 ROOT_URLCONF = 'core.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'core.template_backends.ProfilingDjangoTemplates',          # DjangoTemplates timed for SQLProfilingMiddleware
         'DIRS': ["templates"],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -80,9 +90,49 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        # a file rather than SQLite's shared in-memory database, so the threads of the concurrency tests
+        # wait for each other's locks instead of failing with "database table is locked"
+        'TEST': {'NAME': os.path.join(BASE_DIR, 'test_db.sqlite3')},
+    }
+}
+
+# optional read replica for reports and listings (core/db_routers.py); a second SQLite file can stand in for it
+if os.environ.get('REPLICA_DB_NAME'):
+    DATABASES['replica'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.environ['REPLICA_DB_NAME'],
+        'TEST': {'MIRROR': 'default'},
+    }
+REPLICA_DATABASE = 'replica'
+REPLICA_PIN_SECONDS = 5                                          # reads stay on the primary this long after a client writes
+DATABASE_ROUTERS = ['core.db_routers.PrimaryReplicaRouter']
+
+# -------------------------------------------------------------------
+# Cache
+# -------------------------------------------------------------------
+# file based so every worker process sees the same inventory change stamp (inventory/changes.py)
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache'),
     }
 }
 
+# rendered bill pages and PDFs (transactions/bill_artifacts.py)
+BILL_ARTIFACT_DIR = os.path.join(BASE_DIR, 'cache', 'bills')
+# processes rendering a batch of bills in the print view (print_bills has its own --workers)
+BILL_PRINT_WORKERS = 1
+
+# tax lines of sale bills, in this order (transactions/taxes.py); 'on' is 'subtotal' or 'running' (the subtotal
+# plus the taxes before it), withheld taxes are deducted from the amount payable
+SALE_TAXES = [
+    {'code': 'vat', 'label': 'VAT @ 15%', 'rate': '0.15'},
+    {'code': 'withholding', 'label': 'Withholding Tax 3%', 'rate': '0.03', 'on': 'running', 'withheld': True},
+]
+
+# wholesale purchase bills carry up to ~500 formset lines of 3 fields each
+DATA_UPLOAD_MAX_NUMBER_FIELDS = 5000
+
 # -------------------------------------------------------------------
 # Password validation
 # -------------------------------------------------------------------
@@ -118,3 +168,17 @@ LOGIN_REQUIRED_IGNORE_VIEW_NAMES = [
     'logout',
     'about',
 ]
+
+# -------------------------------------------------------------------
+# Logging
+# -------------------------------------------------------------------
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'core.sql': {'handlers': ['console'], 'level': 'INFO', 'propagate': False},
+    },
+}
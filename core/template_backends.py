@@ -0,0 +1,32 @@
+import time
+
+from django.template.backends.django import DjangoTemplates, Template
+
+
+class TimedTemplate(Template):
+    """
+    Template that adds its render time to request._render_seconds when SQLProfilingMiddleware set it,
+    so render() and TemplateResponse views are timed alike. Templates rendered while another one of the
+    same request renders (e.g. by a tag) are part of the outer figure and not counted again.
+    """
+
+    def render(self, context=None, request=None):
+        if request is None or not hasattr(request, '_render_seconds') or getattr(request, '_rendering', False):
+            return super().render(context, request)
+        request._rendering = True
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            request._rendering = False
+            request._render_seconds = (request._render_seconds or 0) + time.perf_counter() - started
+
+
+class ProfilingDjangoTemplates(DjangoTemplates):
+    """The Django template backend with TimedTemplate templates"""
+
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name).template, self)
@@ -0,0 +1,187 @@
+import shutil
+import statistics
+import tempfile
+import time
+import tracemalloc
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db import connection, reset_queries
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.utils import timezone
+
+from inventory.ledger import rebuild_ledger
+from inventory.locations import default_location_id, rebuild_locations
+from inventory.models import Stock
+from transactions.bill_totals import sync_bill_totals
+from transactions.models import (
+    Supplier, PurchaseBill, PurchaseItem, PurchaseBillDetails, SaleBill, SaleItem, SaleBillDetails
+)
+
+
+# stock count per named scale; bills are a tenth of that with ten lines each, for purchases and sales alike
+SCALES = {
+    'small': 1000,
+    'medium': 10000,
+    'large': 100000,
+}
+# timing and memory only count as regressions past these absolute margins too, small views are noisy
+MIN_MS_DELTA = 20
+MIN_KIB_DELTA = 256
+# wall time is the median of this many requests
+REPEATS = 5
+LINES_PER_BILL = 10
+HISTORY_DAYS = 90
+BATCH_SIZE = 2000
+# the seeded data sends no signals, so the change stamp does not move: pages cached during a run must never
+# reach the real cache, and bill files rendered for seeded bills would take the paths of real bills
+BENCHMARK_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'benchmark-views'},
+}
+
+
+def seed(stock_count):
+    """Fills an empty database with synthetic stocks, suppliers and bills spread over the last HISTORY_DAYS days"""
+    stocks = Stock.objects.bulk_create(
+        (Stock(name=f"stock-{n:06d}", quantity=n % 500) for n in range(stock_count)), batch_size=BATCH_SIZE
+    )
+    suppliers = Supplier.objects.bulk_create(
+        Supplier(
+            name=f"Supplier {n}", phone=f"{n:010d}", address="-", email=f"supplier{n}@example.com", gstin=f"{n:015d}"
+        )
+        for n in range(max(10, stock_count // 100))
+    )
+
+    bill_count = max(1, stock_count // LINES_PER_BILL)
+    purchases = PurchaseBill.objects.bulk_create(
+        (PurchaseBill(supplier=suppliers[n % len(suppliers)]) for n in range(bill_count)), batch_size=BATCH_SIZE
+    )
+    sales = SaleBill.objects.bulk_create(
+        (
+            SaleBill(name=f"Customer {n}", phone=f"{n:010d}", address="-", email=f"customer{n}@example.com", gstin="-")
+            for n in range(bill_count)
+        ),
+        batch_size=BATCH_SIZE,
+    )
+    PurchaseBillDetails.objects.bulk_create((PurchaseBillDetails(billno=bill) for bill in purchases), batch_size=BATCH_SIZE)
+    SaleBillDetails.objects.bulk_create((SaleBillDetails(billno=bill) for bill in sales), batch_size=BATCH_SIZE)
+
+    location = default_location_id()
+
+    def lines(bills, model, quantity, price):
+        for n, bill in enumerate(bills):
+            for line in range(LINES_PER_BILL):
+                stock = stocks[(n * LINES_PER_BILL + line) % len(stocks)]
+                yield model(
+                    billno=bill, stock=stock, location_id=location, quantity=quantity, perprice=price,
+                    totalprice=quantity * price,
+                )
+
+    PurchaseItem.objects.bulk_create(lines(purchases, PurchaseItem, 10, 4), batch_size=BATCH_SIZE)
+    SaleItem.objects.bulk_create(lines(sales, SaleItem, 3, 7), batch_size=BATCH_SIZE)
+
+    # bill times are auto_now, spread them over the history afterwards
+    now = timezone.now()
+    per_day = max(1, bill_count // HISTORY_DAYS)
+    for day in range(HISTORY_DAYS):
+        window = slice(day * per_day, (day + 1) * per_day)
+        if not purchases[window]:
+            break
+        moment = now - timedelta(days=HISTORY_DAYS - day)
+        PurchaseBill.objects.filter(pk__in=[bill.pk for bill in purchases[window]]).update(time=moment)
+        SaleBill.objects.filter(pk__in=[bill.pk for bill in sales[window]]).update(time=moment)
+
+    sync_bill_totals(PurchaseBill)
+    sync_bill_totals(SaleBill)
+    rebuild_ledger()
+    rebuild_locations()
+    return {'supplier': suppliers[0].name, 'purchase': purchases[0].pk, 'sale': sales[0].pk}
+
+
+def view_urls(seeded):
+    """(name, url) of every view covered by the suite"""
+    today = timezone.localdate()
+    return [
+        ('HomeView', '/'),
+        ('StockListView', '/inventory/'),
+        ('inventory_dashboard', '/inventory/dashboard/'),
+        ('inventory_report', '/inventory/inventory_report/'),
+        ('inventory_report (30 days)', f"/inventory/inventory_report/?start_date={today - timedelta(days=30)}&end_date={today}"),
+        ('inventory_balance', '/inventory/inventory_balance/'),
+        ('PurchaseView', '/transactions/purchases/'),
+        ('SaleView', '/transactions/sales/'),
+        ('SupplierListView', '/transactions/suppliers/'),
+        ('SupplierView', f"/transactions/suppliers/{seeded['supplier']}"),
+        ('PurchaseBillView', f"/transactions/purchases/bill/{seeded['purchase']}/"),
+        ('SaleBillView', f"/transactions/sales/{seeded['sale']}"),
+    ]
+
+
+def measure(client, url):
+    """Status, query count, median wall time (ms) and peak Python memory (KiB) of a GET, after a warm-up request"""
+    client.get(url)
+
+    timings = []
+    for _ in range(REPEATS):
+        # every request starts by clearing the query log, so start the capture from an empty one
+        reset_queries()
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            response = client.get(url)
+            if response.streaming:
+                b''.join(response.streaming_content)
+            timings.append(time.perf_counter() - started)
+
+    tracemalloc.start()
+    try:
+        client.get(url)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'status': response.status_code,
+        'queries': len(queries.captured_queries),
+        'ms': round(statistics.median(timings) * 1000, 1),
+        'peak_kib': round(peak / 1024),
+    }
+
+
+def run(stock_count):
+    """
+    Seeds the current (throwaway) database and measures every view, returns {view name: metrics}.
+    The cache and the rendered bill files are kept in memory and a temporary directory for the run.
+    """
+    artifact_dir = tempfile.mkdtemp(prefix='benchmark-bills-')
+    try:
+        with override_settings(CACHES=BENCHMARK_CACHES, BILL_ARTIFACT_DIR=artifact_dir):
+            cache.clear()
+            try:
+                seeded = seed(stock_count)
+                client = Client(raise_request_exception=False)
+                return {name: dict(measure(client, url), url=url) for name, url in view_urls(seeded)}
+            finally:
+                cache.clear()
+    finally:
+        shutil.rmtree(artifact_dir, ignore_errors=True)
+
+
+def regressions(results, baseline, tolerance):
+    """
+    Compares results with a saved baseline. Any change of status or extra query is a regression;
+    time and memory may grow by 'tolerance' (a fraction) before they count.
+    """
+    found = []
+    for name, metrics in results.items():
+        saved = baseline.get(name)
+        if saved is None:
+            continue
+        if metrics['status'] != saved['status']:
+            found.append(f"{name}: status {saved['status']} -> {metrics['status']}")
+        if metrics['queries'] > saved['queries']:
+            found.append(f"{name}: queries {saved['queries']} -> {metrics['queries']}")
+        for key, margin in (('ms', MIN_MS_DELTA), ('peak_kib', MIN_KIB_DELTA)):
+            if metrics[key] > max(saved[key] * (1 + tolerance), saved[key] + margin):
+                found.append(f"{name}: {key} {saved[key]} -> {metrics[key]}")
+    return found
@@ -0,0 +1,29 @@
+from django.db.models import Sum, Count
+
+from inventory.changes import cached
+from inventory.models import Stock
+
+
+CHART_TOP_ITEMS = 10
+
+
+def _stock_chart():
+    stocks = Stock.objects.filter(is_deleted=False)
+    top = list(stocks.order_by('-quantity', 'name').values_list('name', 'quantity')[:CHART_TOP_ITEMS])
+    labels = [name for name, _ in top]
+    data = [quantity for _, quantity in top]
+
+    totals = stocks.aggregate(count=Count('pk'), quantity=Sum('quantity'))
+    rest = totals['count'] - len(top)
+    if rest > 0:
+        labels.append(f"Other ({rest} items)")
+        data.append((totals['quantity'] or 0) - sum(data))
+    return {'labels': labels, 'data': data}
+
+
+def stock_chart():
+    """
+    {'labels', 'data'} of the home page chart: the CHART_TOP_ITEMS largest stocks and one bucket for the rest,
+    so the payload does not grow with the catalogue. Cached until the next stock change.
+    """
+    return cached('home:stock-chart', _stock_chart)
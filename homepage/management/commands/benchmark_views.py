@@ -0,0 +1,69 @@
+import json
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from homepage.benchmarks import SCALES, run, regressions
+
+
+class Command(BaseCommand):
+    help = (
+        "Seeds a throwaway test database at one or more scales, then records query count, wall time and "
+        "peak memory of every view. Compares against the saved baseline and fails on regressions."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scales', nargs='+', choices=list(SCALES), default=['small'])
+        parser.add_argument(
+            '--baseline', default=os.path.join(settings.BASE_DIR, 'benchmarks', 'baseline.json'), help="baseline JSON file"
+        )
+        parser.add_argument('--save-baseline', action='store_true', help="store these results as the new baseline")
+        parser.add_argument('--tolerance', type=float, default=1.0, help="allowed relative growth of time and memory (1.0 = double)")
+
+    def handle(self, *args, **options):
+        baseline = {}
+        if os.path.exists(options['baseline']):
+            with open(options['baseline']) as fileobj:
+                baseline = json.load(fileobj)
+
+        results = {}
+        setup_test_environment()
+        try:
+            for scale in options['scales']:
+                # every scale gets a fresh test database so the real one is never touched; run() also keeps
+                # the cache and the rendered bill files away from the real ones
+                old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+                try:
+                    self.stdout.write(f"Seeding {scale} ({SCALES[scale]} stocks)...")
+                    results[scale] = run(SCALES[scale])
+                finally:
+                    connection.creation.destroy_test_db(old_name, verbosity=0)
+                self.report(scale, results[scale])
+        finally:
+            teardown_test_environment()
+
+        if options['save_baseline']:
+            baseline.update(results)
+            os.makedirs(os.path.dirname(options['baseline']), exist_ok=True)
+            with open(options['baseline'], 'w') as fileobj:
+                json.dump(baseline, fileobj, indent=2, sort_keys=True)
+            self.stdout.write(self.style.SUCCESS(f"Baseline saved to {options['baseline']}"))
+            return
+
+        found = []
+        for scale, metrics in results.items():
+            found += [f"[{scale}] {line}" for line in regressions(metrics, baseline.get(scale, {}), options['tolerance'])]
+        for line in found:
+            self.stderr.write(line)
+        if found:
+            raise CommandError(f"{len(found)} regressions against {options['baseline']}")
+        if baseline:
+            self.stdout.write(self.style.SUCCESS("No regressions against the baseline"))
+
+    def report(self, scale, metrics):
+        self.stdout.write(f"{'view':<28} {'status':>6} {'queries':>8} {'ms':>9} {'peak KiB':>9}")
+        for name, row in metrics.items():
+            self.stdout.write(f"{name:<28} {row['status']:>6} {row['queries']:>8} {row['ms']:>9} {row['peak_kib']:>9}")
@@ -0,0 +1,61 @@
+// search box for the stock <select>s rendered by StockAutocompleteWidget: options are fetched
+// from the autocomplete endpoint as you type, a page at a time, instead of shipping the whole catalogue
+(function () {
+    var PAGE_SIZE = 20;
+    var timers = {};
+
+    function addSearchBoxes() {
+        $('select[data-autocomplete-url]').each(function () {
+            if (!$(this).prev('.stock-search').length) {
+                $(this).before('<input type="search" class="textinput form-control stock-search" placeholder="Search stock" autocomplete="off">');
+            }
+        });
+    }
+
+    function load(select, text, offset) {
+        var url = select.data('autocomplete-url') + '?limit=' + PAGE_SIZE + '&offset=' + offset + '&q=' + encodeURIComponent(text);
+        fetch(url, {headers: {'Accept': 'application/json'}})
+            .then(function (response) { return response.json(); })
+            .then(function (page) {
+                select.find('option[data-more]').remove();
+                if (offset === 0) {
+                    select.empty().append($('<option value="">').text(page.results.length ? 'Choose a stock' : 'No stock found'));
+                }
+                page.results.forEach(function (stock) {
+                    select.append(
+                        $('<option>').val(stock.id).text(stock.text)
+                            .attr('data-quantity', stock.quantity)
+                            .attr('data-locations', JSON.stringify(stock.locations))
+                    );
+                });
+                if (page.more) {
+                    select.append($('<option value="">').attr('data-more', offset + PAGE_SIZE).text('More results...'));
+                }
+            });
+    }
+
+    $(document).on('input', '.stock-search', function () {
+        var box = $(this);
+        var select = box.next('select');
+        var key = select.attr('name');
+        clearTimeout(timers[key]);
+        timers[key] = setTimeout(function () { load(select, box.val().trim(), 0); }, 250);
+    });
+
+    $(document).on('focus', '.stock-search', function () {
+        var select = $(this).next('select');
+        if (select.find('option').length <= 1) {
+            load(select, $(this).val().trim(), 0);
+        }
+    });
+
+    $(document).on('change', 'select[data-autocomplete-url]', function () {
+        var more = $(this).find('option:selected').attr('data-more');
+        if (more !== undefined) {
+            $(this).val('');
+            load($(this), $(this).prev('.stock-search').val().trim(), parseInt(more, 10));
+        }
+    });
+
+    $(addSearchBoxes);
+})();
@@ -1,23 +1,19 @@
 from django.shortcuts import render
 from django.views.generic import View, TemplateView
-from inventory.models import Stock
 from transactions.models import SaleBill, PurchaseBill
+from .charts import stock_chart
 
 
+# reads the primary: the stock chart is cached under change_stamp(), which a lagging replica would outrun
 class HomeView(View):
     template_name = "home.html"
-    def get(self, request):        
-        labels = []
-        data = []        
-        stockqueryset = Stock.objects.filter(is_deleted=False).order_by('-quantity')
-        for item in stockqueryset:
-            labels.append(item.name)
-            data.append(item.quantity)
+    def get(self, request):
+        chart = stock_chart()
         sales = SaleBill.objects.order_by('-time')[:3]
-        purchases = PurchaseBill.objects.order_by('-time')[:3]
+        purchases = PurchaseBill.objects.select_related('supplier').order_by('-time')[:3]
         context = {
-            'labels'    : labels,
-            'data'      : data,
+            'labels'    : chart['labels'],
+            'data'      : chart['data'],
             'sales'     : sales,
             'purchases' : purchases
         }
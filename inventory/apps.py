@@ -1,5 +1,16 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
+
+
+def _install_search_index(using, **kwargs):
+    from django.db import connections
+    from .search import install_index
+    install_index(connections[using])                                  # table rebuilds during migrate drop the sync triggers
 
 
 class InventoryConfig(AppConfig):
     name = 'inventory'
+
+    def ready(self):
+        from . import signals                                           # noqa: F401
+        post_migrate.connect(_install_search_index, sender=self)
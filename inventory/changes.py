@@ -0,0 +1,31 @@
+import uuid
+
+from django.core.cache import cache
+from django.db import transaction
+
+
+STAMP_KEY = 'inventory:change-stamp'
+CACHED_TIMEOUT = 24 * 60 * 60                                           # entries of older stamps are never read again, let them expire
+
+
+def change_stamp():
+    """Opaque token that changes whenever the catalogue, stock quantities or bills change"""
+    stamp = cache.get(STAMP_KEY)
+    if stamp is None:
+        cache.add(STAMP_KEY, uuid.uuid4().hex, timeout=None)
+        stamp = cache.get(STAMP_KEY)
+    return stamp
+
+
+def _bump():
+    cache.set(STAMP_KEY, uuid.uuid4().hex, timeout=None)
+
+
+def stock_changed():
+    """Invalidates everything cached against the change stamp, once the current transaction commits"""
+    transaction.on_commit(_bump)
+
+
+def cached(name, build):
+    """build() cached under 'name' until the next stock change"""
+    return cache.get_or_set(f"{name}:{change_stamp()}", build, CACHED_TIMEOUT)
@@ -0,0 +1,85 @@
+import asyncio
+import json
+import threading
+
+from django.db import transaction
+
+from .models import Stock
+
+
+SUBSCRIBER_QUEUE_SIZE = 1000                                            # a client that falls this far behind loses its oldest events
+
+
+class Subscription:
+    """Queue of one listener, bound to the event loop it was created in"""
+
+    def __init__(self):
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+
+    def offer(self, event):
+        # runs in the subscriber's loop
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(event)
+
+    async def get(self):
+        return await self.queue.get()
+
+
+class EventBroker:
+    """
+    In-process publish/subscribe: publish() can be called from any thread (sync views run in a thread pool
+    under ASGI) and hands events to every subscriber's event loop. Listeners only see events of their own process.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = set()
+
+    def has_subscribers(self):
+        return bool(self._subscribers)
+
+    def subscribe(self):
+        subscription = Subscription()
+        with self._lock:
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def publish(self, event):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.offer, event)
+            except RuntimeError:                                        # its loop is closed, the client is gone
+                self.unsubscribe(subscription)
+
+
+broker = EventBroker()
+
+
+def _publish_quantities(stock_ids, bill, kind):
+    for stock_id, quantity in Stock.objects.filter(pk__in=stock_ids).values_list('pk', 'quantity'):
+        broker.publish({'stock': stock_id, 'quantity': quantity, 'bill': bill, 'kind': kind})
+
+
+def stock_moved(stock_ids, bill, kind):
+    """
+    Announces the new quantity of 'stock_ids' once the current transaction commits.
+    'bill' is the bill number that moved them (None for several bills), 'kind' one of
+    'purchase', 'sale', 'purchase-deleted', 'sale-deleted'. Does nothing while nobody listens.
+    """
+    if not broker.has_subscribers():
+        return
+    stock_ids = list(stock_ids)
+    transaction.on_commit(lambda: _publish_quantities(stock_ids, bill, kind))
+
+
+def format_event(event):
+    """Server-Sent Events frame of one stock event"""
+    return f"event: stock\ndata: {json.dumps(event)}\n\n".encode()
@@ -0,0 +1,32 @@
+import csv
+
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+
+EXPORT_CHUNK_SIZE = 2000
+
+
+# file-like object whose write() just hands the formatted line back, so csv.writer can feed a generator
+class Echo:
+    def write(self, value):
+        return value
+
+
+def stream_csv(filename, header, rows):
+    """StreamingHttpResponse that writes 'rows' as CSV as they are produced, nothing is buffered"""
+    writer = csv.writer(Echo())
+
+    def lines():
+        yield writer.writerow(header)
+        for row in rows:
+            yield writer.writerow(row)
+
+    response = StreamingHttpResponse(lines(), content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+def local_time(value):
+    """Bill times in the export are written in the site's timezone"""
+    return timezone.localtime(value).strftime('%Y-%m-%d %H:%M:%S')
@@ -1,8 +1,14 @@
 import django_filters
-from .models import Stock    
+from .models import Stock
+from .search import search_stocks
+
 
 class StockFilter(django_filters.FilterSet):                            # Stockfilter used to filter based on name
-    name = django_filters.CharFilter(lookup_expr='icontains')           # allows filtering without entering the full name
+    name = django_filters.CharFilter(method='search_name')              # indexed word/prefix search, ranked by relevance
+
     class Meta:
         model = Stock
-        fields = ['name']
\ No newline at end of file
+        fields = ['name']
+
+    def search_name(self, queryset, name, value):
+        return search_stocks(queryset, value)
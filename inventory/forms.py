@@ -9,4 +9,9 @@ class StockForm(forms.ModelForm):
 
     class Meta:
         model = Stock
-        fields = ['name', 'quantity']
\ No newline at end of file
+        fields = ['name', 'quantity']
+
+
+# form used to upload a stock catalogue for import
+class StockImportUploadForm(forms.Form):
+    file = forms.FileField(label="CSV or XLSX file", widget=forms.ClearableFileInput(attrs={'class': 'form-control', 'accept': '.csv,.xlsx'}))
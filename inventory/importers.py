@@ -0,0 +1,120 @@
+import csv
+import io
+import os
+import zipfile
+
+from django.db import transaction
+
+from .changes import stock_changed
+from .forms import StockForm
+from .locations import settle_default
+from .models import Stock
+
+try:
+    import openpyxl
+except ImportError:                                                     # xlsx support is optional
+    openpyxl = None
+
+
+IMPORT_CHUNK_SIZE = 1000
+COLUMNS = ('name', 'quantity')
+
+
+class ImportFormatError(Exception):
+    imported = 0                                                        # stocks written before the error was found
+
+
+# StockForm without the per-row uniqueness query, an existing name is updated instead of rejected
+class StockImportForm(StockForm):
+    def validate_unique(self):
+        pass
+
+
+def _csv_rows(fileobj):
+    # the file is decoded and parsed as it is read, so a bad byte or quote can turn up on any line
+    reader = csv.DictReader(io.TextIOWrapper(fileobj, encoding='utf-8-sig', newline=''))
+    try:
+        missing = [column for column in COLUMNS if column not in (reader.fieldnames or [])]
+        if missing:
+            raise ImportFormatError("Missing column(s): " + ", ".join(missing))
+        for row in reader:
+            yield reader.line_num, row
+    except UnicodeDecodeError:
+        raise ImportFormatError("The file is not UTF-8 text, save it as CSV UTF-8") from None     # decoded in blocks, no line to point at
+    except csv.Error as exc:
+        raise ImportFormatError(f"Near line {reader.line_num + 1}: {exc}") from None
+
+
+def _xlsx_rows(fileobj):
+    if openpyxl is None:
+        raise ImportFormatError("Reading .xlsx files needs the 'openpyxl' package")
+    try:
+        workbook = openpyxl.load_workbook(fileobj, read_only=True, data_only=True)
+    except (zipfile.BadZipFile, KeyError, OSError):
+        raise ImportFormatError("The file is not a valid .xlsx workbook") from None
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = [str(value).strip().lower() if value is not None else '' for value in next(rows, ())]
+        missing = [column for column in COLUMNS if column not in header]
+        if missing:
+            raise ImportFormatError("Missing column(s): " + ", ".join(missing))
+        for line, values in enumerate(rows, start=2):
+            if all(value is None for value in values):                  # trailing empty rows in spreadsheets
+                continue
+            yield line, {key: value for key, value in zip(header, values) if key}
+    finally:
+        workbook.close()
+
+
+def read_rows(fileobj, filename):
+    """Yields (line number, {column: value}) from a binary CSV or XLSX file, one row at a time"""
+    extension = os.path.splitext(filename)[1].lower()
+    if extension == '.csv':
+        return _csv_rows(fileobj)
+    if extension == '.xlsx':
+        return _xlsx_rows(fileobj)
+    raise ImportFormatError("Only .csv and .xlsx files can be imported")
+
+
+def _flush(chunk):
+    # a chunk is written whole or not at all
+    with transaction.atomic():
+        Stock.objects.bulk_create(
+            chunk.values(),
+            update_conflicts=True,
+            unique_fields=['name'],
+            update_fields=['quantity', 'is_deleted'],
+        )
+        settle_default(Stock.objects.filter(name__in=list(chunk)))
+    stock_changed()
+    return len(chunk)
+
+
+def import_stock(rows, chunk_size=IMPORT_CHUNK_SIZE, on_error=None):
+    """
+    Validates rows with the StockForm rules and upserts them on Stock.name, 'chunk_size' rows per statement.
+    Invalid rows are skipped and passed to on_error(line, messages). Returns (imported, failed).
+    An unreadable file raises ImportFormatError, whose 'imported' counts the stocks of the chunks already written.
+    """
+    imported = failed = 0
+    chunk = {}
+    try:
+        for line, row in rows:
+            form = StockImportForm({column: row.get(column) for column in COLUMNS})
+            if not form.is_valid():
+                failed += 1
+                if on_error is not None:
+                    on_error(line, [f"{field}: {' '.join(errors)}" for field, errors in form.errors.items()])
+                continue
+            stock = form.save(commit=False)
+            stock.is_deleted = False
+            chunk[stock.name] = stock                                   # a name repeated in the chunk keeps its last row
+            if len(chunk) >= chunk_size:
+                imported += _flush(chunk)
+                chunk = {}
+    except ImportFormatError as exc:
+        exc.imported = imported
+        raise
+    if chunk:
+        imported += _flush(chunk)
+    return imported, failed
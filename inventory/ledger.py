@@ -0,0 +1,106 @@
+from collections import defaultdict
+
+from django.db.models import Sum, Max
+from django.utils import timezone
+
+from .models import Stock, StockLedger
+from .movements import increment_rows
+from transactions.models import PurchaseItem, SaleItem
+
+
+# ledger counters (quantity, amount) moved by each kind of bill
+PURCHASED = ('purchased_qty', 'purchased_cost')
+SOLD = ('sold_qty', 'sold_revenue')
+
+
+def _group_by_stock(items):
+    """Sums quantity and total price of line items per stock id"""
+    totals = defaultdict(lambda: [0, 0])
+    for item in items:
+        totals[item.stock_id][0] += item.quantity
+        totals[item.stock_id][1] += item.totalprice
+    return totals
+
+
+def post_totals(totals, counters, reverse=False):
+    """
+    Adds (or with reverse=True, removes) {stock_id: (quantity, amount)} to the PURCHASED or SOLD counters.
+    Call inside the bill's transaction.
+    """
+    if not totals:
+        return
+    qty_field, amount_field = counters
+    sign = -1 if reverse else 1
+    # make sure every touched stock has a ledger row, then bump the counters in the database
+    StockLedger.objects.bulk_create(
+        [StockLedger(stock_id=stock_id) for stock_id in totals], ignore_conflicts=True
+    )
+    changes = {}
+    if not reverse:
+        changes['last_movement'] = timezone.now()
+    deltas = {
+        stock_id: {qty_field: sign * quantity, amount_field: sign * amount}
+        for stock_id, (quantity, amount) in totals.items()
+    }
+    increment_rows(StockLedger.objects.all(), 'stock_id', deltas, **changes)
+
+
+def record_purchase(items, reverse=False):
+    """Adds (or with reverse=True, removes) purchase line items to the ledger. Call inside the bill's transaction."""
+    post_totals(_group_by_stock(items), PURCHASED, reverse)
+
+
+def record_sale(items, reverse=False):
+    """Adds (or with reverse=True, removes) sale line items to the ledger. Call inside the bill's transaction."""
+    post_totals(_group_by_stock(items), SOLD, reverse)
+
+
+def compute_ledger():
+    """Derives the ledger from scratch out of every PurchaseItem and SaleItem, returns {stock_id: StockLedger}"""
+    ledger = {}
+    purchases = (
+        PurchaseItem.objects.values('stock')
+        .annotate(qty=Sum('quantity'), amount=Sum('totalprice'), last=Max('billno__time'))
+        .order_by()
+    )
+    for row in purchases:
+        ledger[row['stock']] = StockLedger(
+            stock_id=row['stock'], purchased_qty=row['qty'], purchased_cost=row['amount'], last_movement=row['last']
+        )
+    sales = (
+        SaleItem.objects.values('stock')
+        .annotate(qty=Sum('quantity'), amount=Sum('totalprice'), last=Max('billno__time'))
+        .order_by()
+    )
+    for row in sales:
+        entry = ledger.setdefault(row['stock'], StockLedger(stock_id=row['stock']))
+        entry.sold_qty = row['qty']
+        entry.sold_revenue = row['amount']
+        if entry.last_movement is None or row['last'] > entry.last_movement:
+            entry.last_movement = row['last']
+    return ledger
+
+
+def rebuild_ledger():
+    """Replaces every ledger row with totals recomputed from the line items"""
+    ledger = compute_ledger()
+    StockLedger.objects.all().delete()
+    StockLedger.objects.bulk_create(ledger.values(), batch_size=500)
+    return len(ledger)
+
+
+def verify_ledger():
+    """Returns a list of (stock name, field, stored, expected) for every ledger counter that has drifted"""
+    expected = compute_ledger()
+    stored = {row.stock_id: row for row in StockLedger.objects.all()}
+    names = dict(Stock.objects.values_list('id', 'name'))
+    fields = ['purchased_qty', 'purchased_cost', 'sold_qty', 'sold_revenue']
+
+    mismatches = []
+    for stock_id in set(expected) | set(stored):
+        want = expected.get(stock_id, StockLedger(stock_id=stock_id))
+        have = stored.get(stock_id, StockLedger(stock_id=stock_id))
+        for field in fields:
+            if getattr(want, field) != getattr(have, field):
+                mismatches.append((names.get(stock_id, stock_id), field, getattr(have, field), getattr(want, field)))
+    return mismatches
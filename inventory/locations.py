@@ -0,0 +1,159 @@
+from collections import defaultdict
+from functools import reduce
+from operator import or_
+
+from django.db.models import Count, Max, Q, Sum
+from django.utils import timezone
+
+from .models import Location, Stock, StockLocation
+from .movements import increment_rows
+from transactions.models import PurchaseItem, SaleItem
+
+
+# Quantities per (stock, location). Bills move the rows of the locations on their lines, in the same
+# batched UPDATEs as the stock itself; direct edits of Stock.quantity (forms, admin, imports) land in the
+# default location, so a stock's rows always add up to its quantity.
+
+# StockLocation counter moved by each kind of bill, and the sign of its effect on the quantity
+PURCHASED = ('purchased_qty', 1)
+SOLD = ('sold_qty', -1)
+
+
+def default_location_id():
+    """Id of the default location, the first one created"""
+    return Location.objects.order_by('pk').values_list('pk', flat=True).first()
+
+
+def group_items(items):
+    """Sums the quantity of line items per (stock_id, location_id)"""
+    totals = defaultdict(int)
+    for item in items:
+        totals[item.stock_id, item.location_id] += item.quantity
+    return totals
+
+
+def post_totals(totals, kind, reverse=False, queryset=None):
+    """
+    Moves {(stock_id, location_id): quantity} in and out of the locations for PURCHASED or SOLD,
+    with one UPDATE per location touched, and returns the number of rows updated. Call inside the bill's
+    transaction, next to apply_stock_deltas().
+    """
+    if not totals:
+        return 0
+    counter, sign = kind
+    if reverse:
+        sign = -sign
+    StockLocation.objects.bulk_create(
+        [StockLocation(stock_id=stock_id, location_id=location_id) for stock_id, location_id in totals],
+        ignore_conflicts=True,
+    )
+    per_location = defaultdict(dict)
+    for (stock_id, location_id), quantity in totals.items():
+        per_location[location_id][stock_id] = {'quantity': sign * quantity, counter: -quantity if reverse else quantity}
+    changes = {} if reverse else {'last_movement': timezone.now()}
+    queryset = queryset if queryset is not None else StockLocation.objects.all()
+    return sum(
+        increment_rows(queryset.filter(location_id=location_id), 'stock_id', deltas, **changes)
+        for location_id, deltas in per_location.items()
+    )
+
+
+def record_items(items, kind):
+    """Moves new line items of a bill at their locations"""
+    post_totals(group_items(items), kind)
+
+
+class OutOfStock(Exception):
+    """Raised by take_items() when a location no longer holds what a sale takes from it"""
+
+
+def take_items(items):
+    """
+    Moves the line items of a sale out of their locations, in guarded UPDATEs that only touch rows still
+    holding the quantity taken. Raises OutOfStock when a row fell short, e.g. to a concurrent sale since the
+    form was validated; the caller's transaction has to roll back then.
+    """
+    totals = group_items(items)
+    if not totals:
+        return
+    held = reduce(or_, (
+        Q(stock_id=stock_id, location_id=location_id, quantity__gte=quantity)
+        for (stock_id, location_id), quantity in totals.items()
+    ))
+    if post_totals(totals, SOLD, queryset=StockLocation.objects.filter(held)) != len(totals):
+        raise OutOfStock
+
+
+def settle_default(stocks):
+    """
+    Sets the default location of 'stocks' (ids or a Stock queryset) to whatever part of their quantity is
+    not held elsewhere, for quantities edited directly. Three statements whatever the number of stocks.
+    """
+    default = default_location_id()
+    if default is None:
+        return
+    held = dict(
+        StockLocation.objects.filter(stock__in=stocks).exclude(location_id=default)
+        .values('stock').annotate(quantity=Sum('quantity')).values_list('stock', 'quantity').order_by()
+    )
+    StockLocation.objects.bulk_create(
+        [
+            StockLocation(stock_id=pk, location_id=default, quantity=quantity - held.get(pk, 0))
+            for pk, quantity in Stock.objects.filter(pk__in=stocks).values_list('pk', 'quantity')
+        ],
+        update_conflicts=True,
+        unique_fields=['location', 'stock'],
+        update_fields=['quantity'],
+        batch_size=500,
+    )
+
+
+def rebuild_locations():
+    """
+    Replaces every StockLocation row with counters recomputed from the line items, then settles the
+    default locations. Returns the number of (stock, location) pairs with movements.
+    """
+    rows = {}
+    for model, (counter, sign) in ((PurchaseItem, PURCHASED), (SaleItem, SOLD)):
+        totals = (
+            model.objects.values('stock', 'location')
+            .annotate(qty=Sum('quantity'), last=Max('billno__time'))
+            .order_by()
+        )
+        for row in totals:
+            key = (row['stock'], row['location'])
+            entry = rows.setdefault(key, StockLocation(stock_id=row['stock'], location_id=row['location']))
+            setattr(entry, counter, row['qty'])
+            entry.quantity += sign * row['qty']
+            if entry.last_movement is None or row['last'] > entry.last_movement:
+                entry.last_movement = row['last']
+    StockLocation.objects.all().delete()
+    StockLocation.objects.bulk_create(rows.values(), batch_size=500)
+    settle_default(Stock.objects.all())
+    return len(rows)
+
+
+def held_at(stock_ids):
+    """{stock_id: {location_id: quantity}} of the given stocks, in one query"""
+    held = defaultdict(dict)
+    for stock_id, location_id, quantity in StockLocation.objects.filter(stock__in=stock_ids).values_list('stock', 'location', 'quantity'):
+        held[stock_id][location_id] = quantity
+    return held
+
+
+def location_summary():
+    """Every location with the number of active stocks it holds and their total quantity, in one grouped query"""
+    active = Q(stocks__stock__is_deleted=False)
+    return Location.objects.annotate(
+        stock_count=Count('stocks', filter=active & ~Q(stocks__quantity=0)),
+        quantity=Sum('stocks__quantity', filter=active),
+    ).order_by('pk')
+
+
+def stocks_at(location):
+    """StockLocation rows of the active stocks at a location, with their stock, by name"""
+    return (
+        StockLocation.objects.filter(location=location, stock__is_deleted=False)
+        .select_related('stock')
+        .order_by('stock__name')
+    )
@@ -0,0 +1,52 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from inventory.locations import default_location_id
+from inventory.models import Stock
+from inventory.reports import parse_date_range, build_inventory_report
+from transactions.models import Supplier, PurchaseBill, PurchaseItem, SaleBill, SaleItem
+
+
+class Command(BaseCommand):
+    help = "Seeds synthetic stocks and bills at several sizes and shows that the inventory report runs a flat number of queries"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', nargs='+', type=int, default=[100, 1000, 5000], help="stock counts to benchmark")
+        parser.add_argument('--lines', type=int, default=2, help="purchase and sale lines per stock")
+
+    def handle(self, *args, **options):
+        start_date, end_date = parse_date_range({})
+        self.stdout.write(f"{'stocks':>8} {'queries':>8} {'seconds':>9}")
+        for size in options['sizes']:
+            # everything is seeded inside a transaction that is rolled back afterwards
+            with transaction.atomic():
+                self.seed(size, options['lines'])
+                with CaptureQueriesContext(connection) as ctx:
+                    started = time.perf_counter()
+                    rows = build_inventory_report(start_date, end_date)
+                    elapsed = time.perf_counter() - started
+                transaction.set_rollback(True)
+            assert len(rows) >= size
+            self.stdout.write(f"{size:>8} {len(ctx.captured_queries):>8} {elapsed:>9.3f}")
+
+    def seed(self, size, lines):
+        stocks = Stock.objects.bulk_create(
+            Stock(name=f"bench-{size}-{n}", quantity=0) for n in range(size)
+        )
+        supplier = Supplier.objects.create(
+            name="Benchmark", phone=f"9{size:011d}", address="-", email=f"bench{size}@example.com", gstin=f"B{size:014d}"
+        )
+        purchase = PurchaseBill.objects.create(supplier=supplier)
+        sale = SaleBill.objects.create(name="Benchmark", phone="0", address="-", email="bench@example.com", gstin="-")
+        location = default_location_id()
+        PurchaseItem.objects.bulk_create(
+            PurchaseItem(billno=purchase, stock=stock, location_id=location, quantity=10, perprice=5, totalprice=50)
+            for stock in stocks for _ in range(lines)
+        )
+        SaleItem.objects.bulk_create(
+            SaleItem(billno=sale, stock=stock, location_id=location, quantity=3, perprice=7, totalprice=21)
+            for stock in stocks for _ in range(lines)
+        )
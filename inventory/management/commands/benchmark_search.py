@@ -0,0 +1,59 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from inventory.models import Stock
+from inventory.search import index_available, search_stocks
+
+
+WORDS = (
+    'steel', 'brass', 'copper', 'plastic', 'rubber', 'bolt', 'nut', 'washer', 'screw', 'hinge', 'bracket',
+    'pipe', 'valve', 'hose', 'clamp', 'cable', 'switch', 'socket', 'bulb', 'paint', 'brush', 'tape', 'glue',
+)
+QUERIES = ('b', 'bol', 'bolt', 'steel bo', 'clamp hose', 'ocke', 'zzz')
+
+
+class Command(BaseCommand):
+    help = "Seeds synthetic stocks and compares the indexed stock search with an icontains scan on the list page queries"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size', type=int, default=100000, help="number of stocks")
+        parser.add_argument('--repeat', type=int, default=5, help="runs per query, the median is shown")
+
+    def handle(self, *args, **options):
+        if not index_available():
+            raise CommandError("The stock search index is not installed on this database (run migrate on SQLite with FTS5)")
+        # everything is seeded inside a transaction that is rolled back afterwards
+        with transaction.atomic():
+            self.seed(options['size'])
+            self.stdout.write(f"{'query':<12} {'matches':>8} {'index ms':>9} {'icontains ms':>13}")
+            for text in QUERIES:
+                active = Stock.objects.filter(is_deleted=False)
+                matches, indexed = self.time_page(search_stocks(active, text), options['repeat'])
+                _, scanned = self.time_page(active.filter(name__icontains=text).order_by('name'), options['repeat'])
+                self.stdout.write(f"{text:<12} {matches:>8} {indexed:>9.1f} {scanned:>13.1f}")
+            transaction.set_rollback(True)
+
+    def time_page(self, queryset, repeat):
+        # what the paginated list view runs: a count and the first page
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            count = queryset.count()
+            list(queryset[:10])
+            timings.append(time.perf_counter() - started)
+        return count, statistics.median(timings) * 1000
+
+    def seed(self, size):
+        rng = random.Random(0)
+        Stock.objects.bulk_create(
+            (
+                Stock(name=f"{' '.join(rng.sample(WORDS, 2))} {n}"[:30], quantity=n % 100)
+                for n in range(size)
+            ),
+            batch_size=2000,
+        )
+        connection.cursor().execute('ANALYZE')
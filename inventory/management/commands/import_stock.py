@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from inventory.importers import IMPORT_CHUNK_SIZE, ImportFormatError, import_stock, read_rows
+
+
+class Command(BaseCommand):
+    help = "Imports stocks from a CSV or XLSX file with 'name' and 'quantity' columns, updating existing names"
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help=".csv or .xlsx file")
+        parser.add_argument('--chunk-size', type=int, default=IMPORT_CHUNK_SIZE, help="rows written per statement")
+
+    def handle(self, *args, **options):
+        def report(line, errors):
+            self.stderr.write(f"line {line}: {'; '.join(errors)}")
+
+        try:
+            with open(options['path'], 'rb') as fileobj:
+                imported, failed = import_stock(
+                    read_rows(fileobj, options['path']), chunk_size=options['chunk_size'], on_error=report
+                )
+        except (OSError, ImportFormatError) as exc:
+            raise CommandError(str(exc))
+        self.stdout.write(self.style.SUCCESS(f"Imported {imported} stocks, {failed} rows rejected"))
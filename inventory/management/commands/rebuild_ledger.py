@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from inventory.ledger import rebuild_ledger, verify_ledger
+from inventory.locations import rebuild_locations
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the per-stock ledger and per-location counters from PurchaseItem/SaleItem and verifies the ledger matches"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verify-only', action='store_true', help="only compare the stored ledger, do not rewrite it")
+
+    def handle(self, *args, **options):
+        if not options['verify_only']:
+            with transaction.atomic():
+                count = rebuild_ledger()
+                pairs = rebuild_locations()
+            self.stdout.write(f"Rebuilt ledger for {count} stocks and {pairs} stock locations")
+
+        mismatches = verify_ledger()
+        for name, field, stored, expected in mismatches:
+            self.stderr.write(f"{name}: {field} is {stored}, expected {expected}")
+        if mismatches:
+            raise CommandError(f"Ledger has {len(mismatches)} mismatched values")
+        self.stdout.write(self.style.SUCCESS("Ledger matches the purchase and sale history"))
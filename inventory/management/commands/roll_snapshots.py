@@ -0,0 +1,27 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from inventory.snapshots import roll_snapshots, rebuild_snapshots, closed_through
+
+
+class Command(BaseCommand):
+    help = "Rolls the daily closing stock snapshots forward from the last checkpoint (run once a day)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--until', help="last day to close, YYYY-MM-DD (default: yesterday)")
+        parser.add_argument('--rebuild', action='store_true', help="discard all snapshots and roll from the first bill")
+
+    def handle(self, *args, **options):
+        until = None
+        if options['until']:
+            try:
+                until = datetime.strptime(options['until'], '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError("--until must be a date in YYYY-MM-DD format")
+
+        if options['rebuild']:
+            written = rebuild_snapshots(until)
+        else:
+            written = roll_snapshots(until)
+        self.stdout.write(self.style.SUCCESS(f"Wrote {written} snapshot rows, closed through {closed_through()}"))
@@ -0,0 +1,45 @@
+# Generated by Django 4.2.23 on 2026-10-18 02:26
+
+from django.db import migrations, models
+from django.db.models import Sum, Max
+import django.db.models.deletion
+
+
+def fill_ledger(apps, schema_editor):
+    StockLedger = apps.get_model('inventory', 'StockLedger')
+    PurchaseItem = apps.get_model('transactions', 'PurchaseItem')
+    SaleItem = apps.get_model('transactions', 'SaleItem')
+
+    ledger = {}
+    for row in PurchaseItem.objects.values('stock').annotate(qty=Sum('quantity'), amount=Sum('totalprice'), last=Max('billno__time')).order_by():
+        ledger[row['stock']] = StockLedger(stock_id=row['stock'], purchased_qty=row['qty'], purchased_cost=row['amount'], last_movement=row['last'])
+    for row in SaleItem.objects.values('stock').annotate(qty=Sum('quantity'), amount=Sum('totalprice'), last=Max('billno__time')).order_by():
+        entry = ledger.setdefault(row['stock'], StockLedger(stock_id=row['stock']))
+        entry.sold_qty = row['qty']
+        entry.sold_revenue = row['amount']
+        if entry.last_movement is None or row['last'] > entry.last_movement:
+            entry.last_movement = row['last']
+    StockLedger.objects.bulk_create(ledger.values(), batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0002_purchase_sale'),
+        ('transactions', '0005_bill'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockLedger',
+            fields=[
+                ('stock', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='ledger', serialize=False, to='inventory.stock')),
+                ('purchased_qty', models.BigIntegerField(default=0)),
+                ('purchased_cost', models.BigIntegerField(default=0)),
+                ('sold_qty', models.BigIntegerField(default=0)),
+                ('sold_revenue', models.BigIntegerField(default=0)),
+                ('last_movement', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.RunPython(fill_ledger, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,48 @@
+from django.db import migrations, models
+import django.db.models.deletion
+import inventory.models
+
+
+def create_search_index(apps, schema_editor):
+    from inventory.search import install_index
+    install_index(schema_editor.connection)
+
+
+def drop_search_index(apps, schema_editor):
+    from inventory.search import drop_index
+    drop_index(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0004_stocksnapshot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockTrigramIndex',
+            fields=[
+                ('name', inventory.models.SearchIndexField()),
+                ('stock', models.OneToOneField(db_column='rowid', db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='trigram_index', serialize=False, to='inventory.stock')),
+            ],
+            options={
+                'db_table': 'inventory_stock_trigram',
+                'abstract': False,
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='StockWordIndex',
+            fields=[
+                ('name', inventory.models.SearchIndexField()),
+                ('stock', models.OneToOneField(db_column='rowid', db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='word_index', serialize=False, to='inventory.stock')),
+            ],
+            options={
+                'db_table': 'inventory_stock_fts',
+                'abstract': False,
+                'managed': False,
+            },
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.23 on 2026-10-18 02:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0005_stock_search'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='stock',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['name', 'id'], name='stock_active_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='stock',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['-quantity', 'name'], name='stock_active_quantity_idx'),
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 4.2.23 on 2026-10-18 03:41
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+DEFAULT_LOCATION = 'Main Store'
+
+
+def fill_locations(apps, schema_editor):
+    # every stock starts out held at the default location
+    Location = apps.get_model('inventory', 'Location')
+    Stock = apps.get_model('inventory', 'Stock')
+    StockLocation = apps.get_model('inventory', 'StockLocation')
+
+    location = Location.objects.create(name=DEFAULT_LOCATION)
+    StockLocation.objects.bulk_create(
+        (StockLocation(stock_id=pk, location=location, quantity=quantity) for pk, quantity in Stock.objects.values_list('pk', 'quantity')),
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0006_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Location',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+            ],
+            options={
+                'ordering': ['id'],
+            },
+        ),
+        migrations.CreateModel(
+            name='StockLocation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.BigIntegerField(default=0)),
+                ('purchased_qty', models.BigIntegerField(default=0)),
+                ('sold_qty', models.BigIntegerField(default=0)),
+                ('last_movement', models.DateTimeField(blank=True, null=True)),
+                ('location', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='stocks', to='inventory.location')),
+                ('stock', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='locations', to='inventory.stock')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='stocklocation',
+            constraint=models.UniqueConstraint(fields=('location', 'stock'), name='stocklocation_unique'),
+        ),
+        migrations.RunPython(fill_locations, migrations.RunPython.noop),
+    ]
@@ -7,6 +7,13 @@ class Stock(models.Model):
     quantity = models.IntegerField(default=1)
     is_deleted = models.BooleanField(default=False)
 
+    # active stocks are listed by name and charted by quantity
+    class Meta:
+        indexes = [
+            models.Index(fields=['name', 'id'], name='stock_active_name_idx', condition=models.Q(is_deleted=False)),
+            models.Index(fields=['-quantity', 'name'], name='stock_active_quantity_idx', condition=models.Q(is_deleted=False)),
+        ]
+
     def __str__(self):
 	    return self.name
 # inventory/models.py
@@ -24,3 +31,122 @@ class Sale(models.Model):
     quantity = models.IntegerField()
     date = models.DateField(auto_now_add=True)
     # Add other fields you need
+
+
+# running totals per stock, kept up to date by the purchase and sale views
+class StockLedger(models.Model):
+    stock = models.OneToOneField(Stock, on_delete=models.CASCADE, primary_key=True, related_name='ledger')
+    purchased_qty = models.BigIntegerField(default=0)
+    purchased_cost = models.BigIntegerField(default=0)
+    sold_qty = models.BigIntegerField(default=0)
+    sold_revenue = models.BigIntegerField(default=0)
+    last_movement = models.DateTimeField(blank=True, null=True)
+
+    def __str__(self):
+        return "Ledger: " + str(self.stock_id)
+
+    @property
+    def remaining_qty(self):
+        return self.purchased_qty - self.sold_qty
+
+
+# place where stock is kept; the first one (lowest id) is the default location
+class Location(models.Model):
+    name = models.CharField(max_length=50, unique=True)
+
+    class Meta:
+        ordering = ['id']
+
+    def __str__(self):
+        return self.name
+
+
+# quantity of a stock held at a location, with its purchase and sale counters, kept up to date by the
+# purchase and sale views; a stock's quantities at all locations add up to Stock.quantity
+class StockLocation(models.Model):
+    stock = models.ForeignKey(Stock, on_delete=models.CASCADE, related_name='locations')
+    location = models.ForeignKey(Location, on_delete=models.PROTECT, related_name='stocks')
+    quantity = models.BigIntegerField(default=0)
+    purchased_qty = models.BigIntegerField(default=0)
+    sold_qty = models.BigIntegerField(default=0)
+    last_movement = models.DateTimeField(blank=True, null=True)
+
+    # location first, so per-location reads and the per-location summary use the index
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['location', 'stock'], name='stocklocation_unique'),
+        ]
+
+    def __str__(self):
+        return str(self.stock_id) + " @ " + str(self.location_id)
+
+    @property
+    def remaining_qty(self):
+        return self.purchased_qty - self.sold_qty
+
+
+# closing balance of a stock at the end of a day on which it moved
+class StockSnapshot(models.Model):
+    stock = models.ForeignKey(Stock, on_delete=models.CASCADE, related_name='snapshots')
+    date = models.DateField()
+    quantity = models.BigIntegerField(default=0)
+    cost = models.BigIntegerField(default=0)
+
+    class Meta:
+        unique_together = [('stock', 'date')]
+
+    def __str__(self):
+        return str(self.stock_id) + " @ " + str(self.date)
+
+
+# last day that has been rolled into StockSnapshot (single row)
+class SnapshotCheckpoint(models.Model):
+    closed_through = models.DateField()
+
+    def __str__(self):
+        return "Snapshots closed through " + str(self.closed_through)
+
+
+# column of an FTS5 table, filtered with name__match='"word"*'
+class SearchIndexField(models.TextField):
+    pass
+
+
+@SearchIndexField.register_lookup
+class Match(models.Lookup):
+    lookup_name = 'match'
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f"{lhs} MATCH {rhs}", lhs_params + rhs_params
+
+
+# read-only views of the SQLite FTS5 search tables (inventory/search.py), one row per active stock;
+# each table's rowid is the stock id
+class StockSearchEntry(models.Model):
+    name = SearchIndexField()
+
+    class Meta:
+        abstract = True
+        managed = False
+
+
+class StockWordIndex(StockSearchEntry):
+    stock = models.OneToOneField(
+        Stock, on_delete=models.DO_NOTHING, primary_key=True, db_column='rowid', db_constraint=False,
+        related_name='word_index',
+    )
+
+    class Meta(StockSearchEntry.Meta):
+        db_table = 'inventory_stock_fts'
+
+
+class StockTrigramIndex(StockSearchEntry):
+    stock = models.OneToOneField(
+        Stock, on_delete=models.DO_NOTHING, primary_key=True, db_column='rowid', db_constraint=False,
+        related_name='trigram_index',
+    )
+
+    class Meta(StockSearchEntry.Meta):
+        db_table = 'inventory_stock_trigram'
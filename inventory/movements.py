@@ -0,0 +1,53 @@
+from collections import defaultdict
+
+from django.db.models import F, Case, When, Value
+
+from .changes import stock_changed
+from .models import Stock
+
+
+# rows per UPDATE ... CASE statement, keeps each statement well under SQLite's bound parameter limit
+UPDATE_CHUNK_SIZE = 250
+
+
+def quantity_deltas(items, sign=1):
+    """Merges line items into {stock_id: quantity change}; several lines of the same stock become one entry"""
+    deltas = defaultdict(int)
+    for item in items:
+        deltas[item.stock_id] += sign * item.quantity
+    return deltas
+
+
+def increment_rows(queryset, key, deltas, **changes):
+    """
+    Adds per-row amounts to numeric columns with one UPDATE per chunk of rows:
+    SET field = field + CASE key WHEN k1 THEN d1 WHEN k2 THEN d2 ... END.
+    'deltas' is {key value: {field: amount}}, extra keyword arguments are set on every updated row.
+    Returns the number of rows updated.
+    """
+    updated = 0
+    keys = list(deltas)
+    for start in range(0, len(keys), UPDATE_CHUNK_SIZE):
+        chunk = keys[start:start + UPDATE_CHUNK_SIZE]
+        fields = {field for k in chunk for field in deltas[k]}
+        update = dict(changes)
+        for field in fields:
+            output_field = type(queryset.model._meta.get_field(field))()
+            update[field] = F(field) + Case(
+                *[When(**{key: k}, then=Value(deltas[k].get(field, 0))) for k in chunk],
+                default=Value(0),
+                output_field=output_field,
+            )
+        updated += queryset.filter(**{key + '__in': chunk}).update(**update)
+    return updated
+
+
+def apply_stock_deltas(deltas, queryset=None):
+    """
+    Applies {stock_id: quantity change} in the database (quantity = quantity + n), batched into as few
+    UPDATE statements as possible, so concurrent bills on the same stock cannot overwrite each other.
+    Call inside the bill's transaction.
+    """
+    deltas = {stock_id: {'quantity': delta} for stock_id, delta in deltas.items() if delta}
+    increment_rows(queryset if queryset is not None else Stock.objects.all(), 'pk', deltas)
+    stock_changed()
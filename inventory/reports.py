@@ -0,0 +1,160 @@
+from datetime import datetime, date, timedelta
+
+from django.db.models import Sum, Count, Q
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
+
+from .changes import cached
+from .models import Stock, Location
+from .snapshots import closed_through, annotate_snapshot, day_start
+from transactions.models import PurchaseBill, PurchaseItem, SaleBill, SaleItem
+
+
+DEFAULT_START_DATE = date(2000, 1, 1)
+RECENT_BILLS = 5
+
+
+def parse_date_range(params):
+    """Reads 'start_date' / 'end_date' (YYYY-MM-DD) from a GET querydict, falling back to everything up to today"""
+    start_date_str = params.get('start_date')
+    end_date_str = params.get('end_date')
+
+    if start_date_str and end_date_str:
+        start_date = datetime.strptime(start_date_str, '%Y-%m-%d').date()
+        end_date = datetime.strptime(end_date_str, '%Y-%m-%d').date()
+    else:
+        start_date = DEFAULT_START_DATE
+        end_date = timezone.localdate()
+    return start_date, end_date
+
+
+def parse_location(params):
+    """The Location picked with 'location' (its id) in a GET querydict, None for all locations; 404 for an unknown id"""
+    value = params.get('location')
+    if not value or not str(value).isdigit():
+        return None
+    return get_object_or_404(Location, pk=value)
+
+
+def _movement_totals(model, start_date, end_date, since=None, location=None):
+    """
+    Groups the line items of 'model' (PurchaseItem or SaleItem) by stock in a single query and
+    returns {stock_id: {'begin_qty', 'begin_cost', 'period_qty', 'period_cost'}}.
+    With 'since', only movements from that day on are read (the rest comes from a snapshot);
+    with 'location', only the movements at that location.
+    """
+    start = day_start(start_date)
+    end = day_start(end_date + timedelta(days=1))
+    before = Q(billno__time__lt=start)
+    during = Q(billno__time__gte=start)
+
+    rows = model.objects.filter(billno__time__lt=end)
+    if since is not None:
+        rows = rows.filter(billno__time__gte=day_start(since))
+    if location is not None:
+        rows = rows.filter(location=location)
+    rows = (
+        rows
+        .values('stock')
+        .annotate(
+            begin_qty=Sum('quantity', filter=before),
+            begin_cost=Sum('totalprice', filter=before),
+            period_qty=Sum('quantity', filter=during),
+            period_cost=Sum('totalprice', filter=during),
+        )
+        .order_by()
+    )
+    return {row['stock']: row for row in rows}
+
+
+def build_inventory_report(start_date, end_date, location=None):
+    """
+    Computes the beginning, in-period and ending quantity/cost for every active stock.
+    Runs a fixed number of queries (stocks, grouped purchases, grouped sales) regardless of catalogue size.
+
+    When daily snapshots exist, the beginning balance starts from the nearest snapshot before 'start_date'
+    and only the days after it are scanned, so the cost depends on the range and not on the whole history.
+    For a single 'location', only the stocks kept there and their movements there are read; snapshots
+    cover all locations, so these reports do not use them.
+    """
+    stocks = Stock.objects.filter(is_deleted=False).order_by('name')
+    anchor = closed_through() if location is None else None
+    if location is not None:
+        stocks = stocks.filter(locations__location=location)
+    if anchor is not None:
+        anchor = min(anchor, start_date - timedelta(days=1))
+        stocks = annotate_snapshot(stocks, anchor).values_list('id', 'name', 'snap_qty', 'snap_cost')
+        since = anchor + timedelta(days=1)
+    else:
+        stocks = stocks.values_list('id', 'name')
+        since = None
+    purchases = _movement_totals(PurchaseItem, start_date, end_date, since, location)
+    sales = _movement_totals(SaleItem, start_date, end_date, since, location)
+
+    empty = {}
+    stock_data = []
+    for stock_id, name, *snapshot in stocks:
+        purchased = purchases.get(stock_id, empty)
+        sold = sales.get(stock_id, empty)
+        snap_qty, snap_cost = snapshot or (0, 0)
+
+        begin_qty = (snap_qty or 0) + (purchased.get('begin_qty') or 0) - (sold.get('begin_qty') or 0)
+        begin_cost = (snap_cost or 0) + (purchased.get('begin_cost') or 0) - (sold.get('begin_cost') or 0)
+
+        purchased_qty = purchased.get('period_qty') or 0
+        purchased_cost = purchased.get('period_cost') or 0
+        sold_qty = sold.get('period_qty') or 0
+        sold_cost = sold.get('period_cost') or 0
+
+        end_qty = begin_qty + purchased_qty - sold_qty
+        end_cost = begin_cost + purchased_cost - sold_cost
+        avg_cost = round(end_cost / end_qty, 2) if end_qty > 0 else 0
+
+        stock_data.append({
+            'name': name,
+            'begin_qty': begin_qty,
+            'begin_cost': begin_cost,
+            'purchased_qty': purchased_qty,
+            'purchased_cost': purchased_cost,
+            'sold_qty': sold_qty,
+            'sold_cost': sold_cost,
+            'end_qty': end_qty,
+            'end_cost': end_cost,
+            'avg_cost': avg_cost,
+        })
+    return stock_data
+
+
+def stock_totals():
+    """(number of active stocks, their total quantity) in one aggregate query"""
+    totals = Stock.objects.filter(is_deleted=False).aggregate(items=Count('pk'), quantity=Sum('quantity'))
+    return totals['items'], totals['quantity'] or 0
+
+
+def _dashboard_metrics():
+    total_items, total_qty = stock_totals()
+    sales = SaleBill.objects.order_by('-time').values('billno', 'time', 'name', 'total_amount')[:RECENT_BILLS]
+    purchases = (
+        PurchaseBill.objects.order_by('-time')
+        .values('billno', 'time', 'supplier__name', 'total_amount')[:RECENT_BILLS]
+    )
+    return {
+        'total_items': total_items,
+        'total_qty': total_qty,
+        'recent_sales': [
+            {'billno': row['billno'], 'time': row['time'], 'name': row['name'], 'total': row['total_amount']}
+            for row in sales
+        ],
+        'recent_purchases': [
+            {'billno': row['billno'], 'time': row['time'], 'supplier': row['supplier__name'], 'total': row['total_amount']}
+            for row in purchases
+        ],
+    }
+
+
+def dashboard_metrics():
+    """
+    Figures of the inventory dashboard as plain JSON-ready values. Cached until the next stock change, so the
+    request that misses the ETag after a change runs the totals and recent-bill queries once for every poller.
+    """
+    return cached('inventory:dashboard', _dashboard_metrics)
@@ -0,0 +1,142 @@
+import re
+
+from django.db import connections, OperationalError
+from django.db.models import Case, When, Value, IntegerField
+
+
+# FTS5 indexes over the names of active stocks, filled and kept in sync by triggers and read through the
+# StockWordIndex / StockTrigramIndex models: word/prefix matching with a prefix index, and a trigram index
+# for matches inside words
+TOKEN_TABLE = 'inventory_stock_fts'
+TRIGRAM_TABLE = 'inventory_stock_trigram'
+TRIGRAM_MIN_LENGTH = 3                                                  # shorter terms have no trigram to look up
+
+TABLE_OPTIONS = {
+    TOKEN_TABLE: "tokenize = 'unicode61 remove_diacritics 2', prefix = '1 2 3'",
+    TRIGRAM_TABLE: "tokenize = 'trigram'",
+}
+TRIGGERS = ('inventory_stock_search_insert', 'inventory_stock_search_delete', 'inventory_stock_search_update')
+
+_available = {}
+
+
+def _sync_statements(row):
+    # only active stocks are indexed; 'delete' has to be given the indexed values of the row
+    add = ''.join(
+        f"INSERT INTO {table}(rowid, name) SELECT {row}.id, {row}.name WHERE NOT {row}.is_deleted;"
+        for table in TABLE_OPTIONS
+    )
+    remove = ''.join(
+        f"INSERT INTO {table}({table}, rowid, name) SELECT 'delete', {row}.id, {row}.name WHERE NOT {row}.is_deleted;"
+        for table in TABLE_OPTIONS
+    )
+    return add, remove
+
+
+def install_index(connection):
+    """
+    Creates the FTS5 tables and the triggers that keep them in sync with inventory_stock, and refills them.
+    Does nothing when everything is in place already. SQLite drops the triggers whenever a migration rebuilds
+    inventory_stock, so this also runs after every migrate. Returns False where FTS5 is not available.
+    """
+    if connection.vendor != 'sqlite':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT name FROM sqlite_master WHERE type IN ('table', 'trigger')")
+        existing = {row[0] for row in cursor.fetchall()}
+        if 'inventory_stock' not in existing:
+            return False
+        if existing.issuperset(TABLE_OPTIONS) and existing.issuperset(TRIGGERS):
+            return True
+        try:
+            for table, options in TABLE_OPTIONS.items():
+                cursor.execute(
+                    f"CREATE VIRTUAL TABLE IF NOT EXISTS {table} "
+                    f"USING fts5(name, content = 'inventory_stock', content_rowid = 'id', {options})"
+                )
+        except OperationalError:                                        # SQLite built without FTS5 (or trigram before 3.34)
+            for table in TABLE_OPTIONS:
+                cursor.execute(f"DROP TABLE IF EXISTS {table}")
+            return False
+
+        insert, _ = _sync_statements('new')
+        _, delete = _sync_statements('old')
+        for trigger in TRIGGERS:
+            cursor.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        cursor.execute(f"CREATE TRIGGER inventory_stock_search_insert AFTER INSERT ON inventory_stock BEGIN {insert} END")
+        cursor.execute(f"CREATE TRIGGER inventory_stock_search_delete AFTER DELETE ON inventory_stock BEGIN {delete} END")
+        cursor.execute(
+            f"CREATE TRIGGER inventory_stock_search_update AFTER UPDATE OF name, is_deleted ON inventory_stock "
+            f"BEGIN {delete}{insert} END"
+        )
+        for table in TABLE_OPTIONS:
+            cursor.execute(f"INSERT INTO {table}({table}) VALUES ('delete-all')")
+            cursor.execute(f"INSERT INTO {table}(rowid, name) SELECT id, name FROM inventory_stock WHERE NOT is_deleted")
+    _available.pop(connection.alias, None)
+    return True
+
+
+def drop_index(connection):
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for trigger in TRIGGERS:
+            cursor.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        for table in TABLE_OPTIONS:
+            cursor.execute(f"DROP TABLE IF EXISTS {table}")
+    _available.pop(connection.alias, None)
+
+
+def index_available(alias='default'):
+    """True when the FTS5 tables exist on this database (SQLite built with FTS5), checked once per process"""
+    if alias not in _available:
+        connection = connections[alias]
+        _available[alias] = (
+            connection.vendor == 'sqlite'
+            and TOKEN_TABLE in connection.introspection.table_names(include_views=False)
+        )
+    return _available[alias]
+
+
+def _terms(text):
+    return re.findall(r'\w+', text.lower())
+
+
+def _matching(queryset, relation, match):
+    """Joins the FTS5 table behind 'relation' and keeps the rows matching 'match'"""
+    return queryset.filter(**{f'{relation}__name__match': match})
+
+
+def _ranked(queryset, text):
+    # the whole name first, then names starting with the text, then the rest by name;
+    # bm25 is left out, on names of a few words it mostly favours short names and costs more than the search
+    return queryset.annotate(
+        search_tier=Case(
+            When(name__iexact=text, then=Value(0)),
+            When(name__istartswith=text, then=Value(1)),
+            default=Value(2),
+            output_field=IntegerField(),
+        ),
+    ).order_by('search_tier', 'name')
+
+
+def search_stocks(queryset, text):
+    """
+    Filters a Stock queryset down to names matching 'text' and orders them by relevance.
+    Every word of 'text' has to start a word of the name ("red pen" finds "Pen, red ballpoint");
+    when nothing matches that way, words of 3+ letters are looked up anywhere inside the name ("allpo").
+    Without the FTS5 index (another database, or SQLite without FTS5) this falls back to icontains.
+    """
+    text = text.strip()
+    terms = _terms(text)
+    if not terms:
+        return queryset
+    if not index_available(queryset.db):
+        return _ranked(queryset.filter(name__icontains=text), text)
+
+    matches = _matching(queryset, 'word_index', ' '.join(f'"{term}"*' for term in terms))
+    if not matches.exists():
+        long_terms = [term for term in terms if len(term) >= TRIGRAM_MIN_LENGTH]
+        if len(long_terms) == len(terms):
+            matches = _matching(queryset, 'trigram_index', ' '.join(f'"{term}"' for term in long_terms))
+    return _ranked(matches, text)
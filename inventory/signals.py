@@ -0,0 +1,27 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .changes import stock_changed
+from .locations import settle_default
+from .models import Stock
+from transactions.models import Supplier, PurchaseItem, SaleItem
+
+
+# Stock edits from forms and the admin; bill creation, deletion and imports go through
+# bulk statements that send no signals and call stock_changed() themselves.
+# No post_delete receiver on the line items, it would turn off fast deletes of bill lines.
+@receiver(post_save, sender=Stock)
+@receiver(post_delete, sender=Stock)
+@receiver(post_save, sender=PurchaseItem)
+@receiver(post_save, sender=SaleItem)
+@receiver(post_save, sender=Supplier)                                   # supplier names are shown with recent purchases
+def stock_saved(sender, **kwargs):
+    stock_changed()
+
+
+# a quantity typed into the stock form is a count of everything on hand: what the other locations
+# do not hold is at the default location
+@receiver(post_save, sender=Stock)
+def stock_quantity_saved(sender, instance, raw=False, **kwargs):
+    if not raw:
+        settle_default([instance.pk])
@@ -0,0 +1,124 @@
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+
+from django.db import transaction
+from django.db.models import Sum, Min, OuterRef, Subquery
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import Stock, StockSnapshot, SnapshotCheckpoint
+from transactions.models import PurchaseBill, PurchaseItem, SaleBill, SaleItem
+
+
+ROLL_WINDOW_DAYS = 31
+
+
+def day_start(day):
+    """Aware datetime for midnight at the beginning of 'day', so bill times can be compared against an index"""
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def closed_through():
+    """Last day whose closing balances are stored, or None if snapshots were never rolled"""
+    return SnapshotCheckpoint.objects.filter(pk=1).values_list('closed_through', flat=True).first()
+
+
+def _set_closed_through(day):
+    SnapshotCheckpoint.objects.update_or_create(pk=1, defaults={'closed_through': day})
+
+
+def annotate_snapshot(queryset, day):
+    """Annotates a Stock queryset with 'snap_qty'/'snap_cost', the closing balance at the end of 'day' (None if never moved)"""
+    latest = StockSnapshot.objects.filter(stock=OuterRef('pk'), date__lte=day).order_by('-date')
+    return queryset.annotate(
+        snap_qty=Subquery(latest.values('quantity')[:1]),
+        snap_cost=Subquery(latest.values('cost')[:1]),
+    )
+
+
+def balances_as_of(day):
+    """{stock_id: (qty, cost)} at the end of 'day', read from the nearest snapshot of each stock"""
+    rows = annotate_snapshot(Stock.objects.all(), day).filter(snap_qty__isnull=False)
+    return {pk: (qty, cost) for pk, qty, cost in rows.values_list('pk', 'snap_qty', 'snap_cost')}
+
+
+def _first_movement_date():
+    first = [
+        model.objects.aggregate(first=Min('time'))['first'] for model in (PurchaseBill, SaleBill)
+    ]
+    first = [value for value in first if value is not None]
+    return timezone.localtime(min(first)).date() if first else None
+
+
+def _daily_movements(start, end):
+    """{day: {stock_id: [qty, cost]}} of net movements between 'start' and 'end' (inclusive)"""
+    daily = defaultdict(lambda: defaultdict(lambda: [0, 0]))
+    for model, sign in ((PurchaseItem, 1), (SaleItem, -1)):
+        rows = (
+            model.objects
+            .filter(billno__time__gte=day_start(start), billno__time__lt=day_start(end + timedelta(days=1)))
+            .annotate(day=TruncDate('billno__time'))
+            .values('day', 'stock')
+            .annotate(qty=Sum('quantity'), cost=Sum('totalprice'))
+            .order_by()
+        )
+        for row in rows:
+            entry = daily[row['day']][row['stock']]
+            entry[0] += sign * row['qty']
+            entry[1] += sign * row['cost']
+    return daily
+
+
+def roll_snapshots(until=None):
+    """
+    Rolls closing snapshots forward from the checkpoint up to 'until' (default: yesterday).
+    Only stocks that moved on a day get a row for it, so the table grows with activity, not with calendar days.
+    Returns the number of snapshot rows written.
+    """
+    until = until or timezone.localdate() - timedelta(days=1)
+    checkpoint = closed_through()
+    if checkpoint is None:
+        start = _first_movement_date()
+        balances = {}
+    else:
+        start = checkpoint + timedelta(days=1)
+        balances = balances_as_of(checkpoint)
+    if start is None or start > until:
+        if checkpoint is None or until > checkpoint:
+            _set_closed_through(until)
+        return 0
+
+    written = 0
+    while start <= until:
+        end = min(start + timedelta(days=ROLL_WINDOW_DAYS - 1), until)
+        rows = []
+        daily = _daily_movements(start, end)
+        for day in sorted(daily):
+            for stock_id, (qty, cost) in daily[day].items():
+                closing_qty, closing_cost = balances.get(stock_id, (0, 0))
+                balances[stock_id] = (closing_qty + qty, closing_cost + cost)
+                rows.append(StockSnapshot(stock_id=stock_id, date=day, quantity=closing_qty + qty, cost=closing_cost + cost))
+        with transaction.atomic():
+            StockSnapshot.objects.bulk_create(rows, batch_size=500)
+            _set_closed_through(end)
+        written += len(rows)
+        start = end + timedelta(days=1)
+    return written
+
+
+def invalidate_from(day):
+    """Drops snapshots from 'day' on, for when history on or before the checkpoint changes (e.g. a bill is deleted)"""
+    checkpoint = closed_through()
+    if checkpoint is None or day > checkpoint:
+        return
+    with transaction.atomic():
+        StockSnapshot.objects.filter(date__gte=day).delete()
+        _set_closed_through(day - timedelta(days=1))
+
+
+def rebuild_snapshots(until=None):
+    """Discards every snapshot and rolls again from the first movement"""
+    with transaction.atomic():
+        StockSnapshot.objects.all().delete()
+        SnapshotCheckpoint.objects.all().delete()
+    return roll_snapshots(until)
@@ -1,3 +1,38 @@
+from unittest import skipUnless
+
+from django.db import connection
 from django.test import TestCase
 
-# Create your tests here.
+from core.pagination import KeysetPaginator
+from .models import Stock
+
+
+PAGE_SIZE = 10
+
+
+@skipUnless(connection.vendor == 'sqlite', "reads SQLite's EXPLAIN QUERY PLAN output")
+class QueryPlanMixin:
+    """Assertions on the EXPLAIN QUERY PLAN of the hot query shapes of the listings, lookups and reports"""
+
+    def assertUsesIndex(self, queryset, index):
+        plan = queryset.explain()
+        self.assertIn(f" INDEX {index} ", f"{plan} ", plan)
+        self.assertNotIn("USE TEMP B-TREE FOR ORDER BY", plan)
+
+
+class StockQueryPlanTests(QueryPlanMixin, TestCase):
+    def setUp(self):
+        self.stocks = KeysetPaginator(Stock.objects.filter(is_deleted=False), ('name', 'id'), PAGE_SIZE)
+
+    def test_stock_list(self):
+        self.assertUsesIndex(self.stocks.rows_after()[:PAGE_SIZE + 1], 'stock_active_name_idx')
+
+    def test_stock_list_next_page(self):
+        self.assertUsesIndex(self.stocks.rows_after(['m', 1])[:PAGE_SIZE + 1], 'stock_active_name_idx')
+
+    def test_stock_list_previous_page(self):
+        self.assertUsesIndex(self.stocks.rows_before(['m', 1])[:PAGE_SIZE + 1], 'stock_active_name_idx')
+
+    def test_home_chart(self):
+        queryset = Stock.objects.filter(is_deleted=False).order_by('-quantity', 'name')[:10]
+        self.assertUsesIndex(queryset, 'stock_active_quantity_idx')
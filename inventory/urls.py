@@ -4,10 +4,15 @@ from . import views
 
 urlpatterns = [
     path('dashboard/', views.inventory_dashboard, name='inventory_dashboard'),
+    path('dashboard/data/', views.inventory_dashboard_data, name='inventory_dashboard_data'),
     path('inventory_report/', views.inventory_report, name='inventory_report'),
+    path('inventory_balance/', views.inventory_balance, name='inventory_balance'),
     path('', views.StockListView.as_view(), name='inventory'),
     path('new', views.StockCreateView.as_view(), name='new-stock'),
     path('add-stock/', views.add_stock, name='add_stock'),
+    path('import/', views.StockImportView.as_view(), name='import-stock'),
+    path('export/', views.export_stock, name='export-stock'),
+    path('autocomplete/', views.stock_autocomplete, name='stock-autocomplete'),
     path('stock/<pk>/edit', views.StockUpdateView.as_view(), name='edit-stock'),
     path('stock/<pk>/delete', views.StockDeleteView.as_view(), name='delete-stock'),
 ]
\ No newline at end of file
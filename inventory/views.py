@@ -2,16 +2,28 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.views.generic import View, ListView, CreateView, UpdateView
 from django.contrib.messages.views import SuccessMessageMixin
 from django.contrib import messages
-from django.db.models import Sum, F
+from django.db.models import F
 from datetime import datetime
 from decimal import Decimal
 from django.utils import timezone
-from .models import Stock, Purchase, Sale
-from .forms import StockForm
+from django.http import JsonResponse, HttpResponseBadRequest
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import require_GET, condition
+from .models import Stock, StockLedger, Location
+from .locations import held_at, location_summary, stocks_at
+from .forms import StockForm, StockImportUploadForm
+from .importers import ImportFormatError, import_stock, read_rows
+from .exports import EXPORT_CHUNK_SIZE, stream_csv
 from transactions.models import SaleBill, PurchaseBill
 from datetime import datetime        # for datetime functions
 from .filters import StockFilter     # import StockFilter from your app's filters.py
+from .reports import parse_date_range, parse_location, build_inventory_report, stock_totals, dashboard_metrics
+from .changes import change_stamp
+from .search import search_stocks
 from django_filters.views import FilterView
+from core.pagination import KeysetPaginationMixin
+from core.db_routers import use_replica
+from django.utils.decorators import method_decorator
 # ======================
 # Add Stock View
 # ======================
@@ -31,12 +43,18 @@ def add_stock(request):
         form = StockForm()
     return render(request, 'inventory/add_stock.html', {'form': form})
 
-class StockListView(FilterView):
+@method_decorator(use_replica, name='dispatch')
+class StockListView(KeysetPaginationMixin, FilterView):
     filterset_class = StockFilter
-    queryset = Stock.objects.filter(is_deleted=False)
+    queryset = Stock.objects.filter(is_deleted=False).order_by('name')     # a search re-orders by relevance
     template_name = 'inventory.html'
     paginate_by = 10
 
+    def get_keyset_ordering(self, queryset):
+        if 'search_tier' in queryset.query.annotations:
+            return ('search_tier', 'name', 'id')
+        return ('name', 'id')
+
 
 class StockCreateView(SuccessMessageMixin, CreateView):                                 # createview class to add new stock, mixin used to display message
     model = Stock                                                                       # setting 'Stock' model as model
@@ -82,12 +100,59 @@ class StockDeleteView(View):
         messages.success(request, self.success_message)
         return redirect('inventory')
 
+# ======================
+# Stock Import
+# ======================
+class StockImportView(View):
+    template_name = 'import_stock.html'
+    max_errors_shown = 100                                                              # only the first errors are kept for display
+
+    def get(self, request):
+        return render(request, self.template_name, {'form': StockImportUploadForm()})
+
+    def post(self, request):
+        form = StockImportUploadForm(request.POST, request.FILES)
+        context = {'form': form}
+        if form.is_valid():
+            upload = form.cleaned_data['file']
+            errors = []
+
+            def collect(line, messages_):
+                if len(errors) < self.max_errors_shown:
+                    errors.append((line, messages_))
+
+            try:
+                imported, failed = import_stock(read_rows(upload.file, upload.name), on_error=collect)
+            except ImportFormatError as exc:
+                form.add_error('file', str(exc))
+                if exc.imported:
+                    messages.warning(request, f"{exc.imported} stocks were imported before the error")
+            else:
+                messages.success(request, f"Imported {imported} stocks, {failed} rows rejected")
+                context.update({'errors': errors, 'failed': failed})
+        return render(request, self.template_name, context)
+
+
+# ======================
+# Stock Export
+# ======================
+def export_stock(request):
+    # current quantities and running totals, so the date range does not apply here
+    rows = (
+        Stock.objects.filter(is_deleted=False)
+        .order_by('name')
+        .values_list('id', 'name', 'quantity', 'ledger__purchased_qty', 'ledger__sold_qty')
+        .iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    )
+    return stream_csv('stock.csv', ['id', 'name', 'quantity', 'purchased', 'sold'], rows)
+
+
 # ======================
 # Inventory Dashboard
 # ======================
+@use_replica
 def inventory_dashboard(request):
-    total_items = Stock.objects.filter(is_deleted=False).count()
-    total_qty = Stock.objects.filter(is_deleted=False).aggregate(total=Sum('quantity'))['total'] or 0
+    total_items, total_qty = stock_totals()
     recent_sales = SaleBill.objects.order_by('-time')[:5]
     recent_purchases = PurchaseBill.objects.order_by('-time')[:5]
 
@@ -100,6 +165,48 @@ def inventory_dashboard(request):
     return render(request, "dashboard.html", context)
 
 
+# ======================
+# Stock autocomplete
+# ======================
+AUTOCOMPLETE_LIMIT = 20
+AUTOCOMPLETE_MAX_LIMIT = 100
+
+
+@require_GET
+def stock_autocomplete(request):
+    """
+    Active stocks matching ?q= (all of them without it) as {results: [{id, text, quantity, locations}], more},
+    paged by ?limit=&offset=; 'locations' is {location id: quantity held there}
+    """
+    try:
+        limit = min(max(int(request.GET.get('limit', AUTOCOMPLETE_LIMIT)), 1), AUTOCOMPLETE_MAX_LIMIT)
+        offset = max(int(request.GET.get('offset', 0)), 0)
+    except ValueError:
+        return HttpResponseBadRequest("limit and offset must be integers")
+    stocks = Stock.objects.filter(is_deleted=False).order_by('name')
+    text = request.GET.get('q', '').strip()
+    if text:
+        stocks = search_stocks(stocks, text)
+    rows = list(stocks.values_list('pk', 'name', 'quantity')[offset:offset + limit + 1])
+    held = held_at([pk for pk, _, _ in rows[:limit]])
+    return JsonResponse({
+        'results': [
+            {'id': pk, 'text': name, 'quantity': quantity, 'locations': held.get(pk, {})}
+            for pk, name, quantity in rows[:limit]
+        ],
+        'more': len(rows) > limit,
+    })
+
+
+# the change stamp only moves when stock or bills change, so pollers get a 304 without any query being run;
+# the payload is read from the primary, a lagging replica would serve old figures under the new stamp
+@require_GET
+@cache_control(no_cache=True)
+@condition(etag_func=lambda request: change_stamp())
+def inventory_dashboard_data(request):
+    return JsonResponse(dashboard_metrics())
+
+
 # ======================
 # Stock List Views
 # ======================
@@ -111,12 +218,18 @@ class StockListView(ListView):
     def get_queryset(self):
         return Stock.objects.filter(is_deleted=False).order_by('name')
     
-class StockListView(FilterView):
+@method_decorator(use_replica, name='dispatch')
+class StockListView(KeysetPaginationMixin, FilterView):
     filterset_class = StockFilter
-    queryset = Stock.objects.filter(is_deleted=False)
+    queryset = Stock.objects.filter(is_deleted=False).order_by('name')     # a search re-orders by relevance
     template_name = 'inventory.html'
     paginate_by = 10
 
+    def get_keyset_ordering(self, queryset):
+        if 'search_tier' in queryset.query.annotations:
+            return ('search_tier', 'name', 'id')
+        return ('name', 'id')
+
 class StockCreateView(SuccessMessageMixin, CreateView):
     model = Stock
     form_class = StockForm
@@ -162,25 +275,36 @@ class StockDeleteView(View):
 # ======================
 # Inventory Balance
 # ======================
+@use_replica
 def inventory_balance(request):
-    stocks = Stock.objects.filter(is_deleted=False).order_by('name')
+    # each stock carries its running totals in one ledger row, so this is a single joined query;
+    # at one location the same totals come from its StockLocation rows
+    location = parse_location(request.GET)
+    if location is None:
+        rows = [
+            (stock, stock.quantity, getattr(stock, 'ledger', None) or StockLedger(stock=stock))
+            for stock in Stock.objects.filter(is_deleted=False).select_related('ledger').order_by('name')
+        ]
+    else:
+        rows = [(entry.stock, entry.quantity, entry) for entry in stocks_at(location)]
     stock_data = []
     total_quantity = total_purchased = total_sold = total_remaining = 0
 
-    for stock in stocks:
-        purchased_total = Purchase.objects.filter(stock=stock).aggregate(total=Sum('quantity'))['total'] or 0
-        sold_total = Sale.objects.filter(stock=stock).aggregate(total=Sum('quantity'))['total'] or 0
-        remaining = purchased_total - sold_total
+    for stock, quantity, entry in rows:
+        purchased_total = entry.purchased_qty
+        sold_total = entry.sold_qty
+        remaining = entry.remaining_qty
 
         stock_data.append({
             'name': stock.name,
-            'quantity_available': stock.quantity,
+            'quantity_available': quantity,
             'purchased': purchased_total,
             'sold': sold_total,
             'remaining_balance': remaining,
+            'last_movement': entry.last_movement,
         })
 
-        total_quantity += stock.quantity
+        total_quantity += quantity
         total_purchased += purchased_total
         total_sold += sold_total
         total_remaining += remaining
@@ -191,6 +315,8 @@ def inventory_balance(request):
         'total_purchased': total_purchased,
         'total_sold': total_sold,
         'total_remaining': total_remaining,
+        'locations': location_summary(),
+        'location': location,
     }
     return render(request, 'inventory_balance.html', context)
 
@@ -200,93 +326,33 @@ def inventory_balance(request):
 # ======================
 
 
+@use_replica
 def inventory_report(request):
-    # Get date range from the GET parameters
-    start_date_str = request.GET.get('start_date')
-    end_date_str = request.GET.get('end_date')
-
-    if start_date_str and end_date_str:
-        start_date = datetime.strptime(start_date_str, '%Y-%m-%d').date()
-        end_date = datetime.strptime(end_date_str, '%Y-%m-%d').date()
-    else:
-        start_date = datetime(2000, 1, 1).date()
-        end_date = datetime.today().date()
-
-    stocks = Stock.objects.filter(is_deleted=False).order_by('name')
-    stock_data = []
-    total_qty = 0
-    total_cost = 0
-
-    for stock in stocks:
-        # Calculate beginning balance (before start date)
-        begin_purchased = Purchase.objects.filter(
-            stock=stock, purchased_date__lt=start_date
-        ).aggregate(
-            qty=Sum('quantity'),
-            cost=Sum(F('quantity') * F('unit_cost'))
-        )
-        begin_sold = Sale.objects.filter(
-            stock=stock, sold_date__lt=start_date
-        ).aggregate(
-            qty=Sum('quantity'),
-            cost=Sum(F('quantity') * F('unit_price'))
-        )
-
-        begin_qty = (begin_purchased['qty'] or 0) - (begin_sold['qty'] or 0)
-        begin_cost = (begin_purchased['cost'] or 0) - (begin_sold['cost'] or 0)
-
-        # Purchases during the period
-        purchased = Purchase.objects.filter(
-            stock=stock, purchased_date__range=(start_date, end_date)
-        ).aggregate(
-            qty=Sum('quantity'),
-            cost=Sum(F('quantity') * F('unit_cost'))
-        )
-
-        # Sales during the period
-        sold = Sale.objects.filter(
-            stock=stock, sold_date__range=(start_date, end_date)
-        ).aggregate(
-            qty=Sum('quantity'),
-            cost=Sum(F('quantity') * F('unit_price'))
-        )
-
-        purchased_qty = purchased['qty'] or 0
-        purchased_cost = purchased['cost'] or 0
-        sold_qty = sold['qty'] or 0
-        sold_cost = sold['cost'] or 0
-
-        # Ending balances
-        end_qty = begin_qty + purchased_qty - sold_qty
-        end_cost = begin_cost + purchased_cost - sold_cost
-        avg_cost = round(end_cost / end_qty, 2) if end_qty > 0 else 0
-
-        stock_data.append({
-            'name': stock.name,
-            'begin_qty': begin_qty,
-            'begin_cost': begin_cost,
-            'purchased_qty': purchased_qty,
-            'purchased_cost': purchased_cost,
-            'sold_qty': sold_qty,
-            'sold_cost': sold_cost,
-            'end_qty': end_qty,
-            'end_cost': end_cost,
-            'avg_cost': avg_cost,
-        })
-
-        total_qty += end_qty
-        total_cost += end_cost
+    # Get date range from the GET parameters; a malformed date shows the whole history with a message, as no dates do
+    try:
+        start_date, end_date = parse_date_range(request.GET)
+        start_text, end_text = request.GET.get('start_date'), request.GET.get('end_date')
+    except ValueError:
+        messages.error(request, "Dates must be given as YYYY-MM-DD, showing the whole history instead.")
+        start_date, end_date = parse_date_range({})
+        start_text = end_text = None
+    location = parse_location(request.GET)
+
+    # One grouped query per movement table instead of four aggregates per stock
+    stock_data = build_inventory_report(start_date, end_date, location)
+    total_qty = sum(row['end_qty'] for row in stock_data)
+    total_cost = sum(row['end_cost'] for row in stock_data)
 
     context = {
         'stocks': stock_data,
-        'total_stocks': stocks.count(),
+        'total_stocks': len(stock_data),
         'total_quantity': total_qty,
         'total_ending_cost': total_cost,
-        'start_date': start_date_str,
-        'end_date': end_date_str,
+        'start_date': start_text,
+        'end_date': end_text,
         'period_start': start_date,
         'period_end': end_date,
+        'locations': Location.objects.all(),
+        'location': location,
     }
     return render(request, 'inventory_report.html', context)
-
-
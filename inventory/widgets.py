@@ -0,0 +1,41 @@
+import json
+
+from django import forms
+from django.urls import reverse_lazy
+
+from .models import Stock
+
+
+class StockAutocompleteWidget(forms.Select):
+    """
+    <select> that only renders the selected stock; static/js/stock-autocomplete.js adds a search box that
+    fills it from the 'stock-autocomplete' endpoint, so the page does not grow with the catalogue.
+    Selected stocks are taken from 'preloaded' ({pk: Stock}) when the formset has loaded them already;
+    each option carries the stock's quantity and its quantity per location (data-locations).
+    """
+    preloaded = None
+
+    def get_context(self, name, value, attrs):
+        context = super().get_context(name, value, attrs)
+        context['widget']['attrs']['data-autocomplete-url'] = str(reverse_lazy('stock-autocomplete'))
+        return context
+
+    def _selected_stocks(self, value):
+        pks = {int(v) for v in value if str(v).isdigit()}
+        if not pks:
+            return []
+        if self.preloaded is not None and pks.issubset(self.preloaded):
+            stocks = self.preloaded
+        else:
+            stocks = Stock.objects.prefetch_related('locations').in_bulk(pks)
+        return [stocks[pk] for pk in sorted(pks) if pk in stocks]
+
+    def optgroups(self, name, value, attrs=None):
+        selected = self._selected_stocks(value)
+        options = [self.create_option(name, '', '---------', not selected, 0)]
+        for index, stock in enumerate(selected, start=1):
+            option = self.create_option(name, stock.pk, str(stock), True, index)
+            option['attrs']['data-quantity'] = stock.quantity
+            option['attrs']['data-locations'] = json.dumps({row.location_id: row.quantity for row in stock.locations.all()})
+            options.append(option)
+        return [(None, options, 0)]
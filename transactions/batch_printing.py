@@ -0,0 +1,149 @@
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from datetime import timedelta
+from functools import partial
+from types import SimpleNamespace
+
+from django.db.models import Prefetch
+from django.utils import timezone
+from django.utils.html import escape
+
+from inventory.snapshots import day_start
+from . import bill_artifacts
+from .models import PurchaseBill, PurchaseItem, SaleBill, SaleItem
+
+
+# bills read per round trip: one query for the bills and one per prefetched relation
+BATCH_SIZE = 200
+
+# kind -> (bill model, item model, items relation, details relation)
+KINDS = {
+    'purchase': (PurchaseBill, PurchaseItem, 'purchasebillno', 'purchasedetailsbillno'),
+    'sale': (SaleBill, SaleItem, 'salebillno', 'saledetailsbillno'),
+}
+# PDFs are compressed already
+COMPRESSION = {'pdf': zipfile.ZIP_STORED, 'html': zipfile.ZIP_DEFLATED}
+
+HTML_PAGE = '<!DOCTYPE html>\n<html><head><meta charset="utf-8"><title>{title}</title></head><body>\n{document}\n</body></html>\n'
+
+
+def bills_in_range(kind, start_date, end_date):
+    """Bills of 'kind' dated start_date..end_date (inclusive) with their items, stocks and details prefetched"""
+    bill_model, item_model, items, details = KINDS[kind]
+    bills = bill_model.objects.filter(
+        time__gte=day_start(start_date),
+        time__lt=day_start(end_date + timedelta(days=1)),
+    ).order_by('time', 'billno').prefetch_related(
+        Prefetch(items, queryset=item_model.objects.select_related('stock').order_by('id')),
+        details,
+    )
+    return bills.select_related('supplier') if kind == 'purchase' else bills.prefetch_related('taxes')
+
+
+def _plain(obj, **related):
+    # model instance as a namespace of its own fields, plus the given related objects
+    return SimpleNamespace(**{field.attname: getattr(obj, field.attname) for field in obj._meta.concrete_fields}, **related)
+
+
+def _portable(kind, context):
+    """
+    The document context with namespaces in place of model instances, for the worker processes:
+    a pickled bill drags its prefetch caches along and costs more to send than to render.
+    """
+    bill = context['bill']
+    related = {'supplier': _plain(bill.supplier)} if kind == 'purchase' else {}
+    return {
+        **context,
+        'bill': _plain(bill, **related),
+        'items': [_plain(item, stock=_plain(item.stock)) for item in context['items']],
+        'billdetails': _plain(context['billdetails']),
+    }
+
+
+def _render(kind, extension, context):
+    # runs in a worker process
+    if extension == 'pdf':
+        return bill_artifacts.render_pdf(kind, context)
+    return bill_artifacts.render_html(kind, context)
+
+
+def _render_batch(kind, bills, extension, pool):
+    """(bill, content) for 'bills' in order; files rendered before are read back, the rest rendered by the pool"""
+    entries = []
+    for bill in bills:
+        details = bill_artifacts.details_of(kind, bill)
+        path = bill_artifacts.artifact_path(kind, bill.billno, details.version, extension)
+        entries.append((bill, details, path, bill_artifacts.read_artifact(path)))
+
+    contexts = [
+        bill_artifacts.document_context(kind, details, bill.get_items_list())
+        for bill, details, path, content in entries if content is None
+    ]
+    render = partial(_render, kind, extension)
+    if pool:
+        # a few large chunks per worker, a bill on its own is too small to be worth a round trip
+        contexts = [_portable(kind, context) for context in contexts]
+        rendered = pool.map(render, contexts, chunksize=max(1, len(contexts) // (pool._max_workers * 4)))
+    else:
+        rendered = map(render, contexts)
+    for bill, details, path, content in entries:
+        if content is None:
+            content = next(rendered)
+            bill_artifacts.write_artifact(path, content)
+        yield bill, content
+
+
+def render_bills(kind, bills, extension='pdf', workers=1):
+    """
+    (bill, rendered document) for every bill of the 'bills_in_range' queryset, in order.
+    With more than one worker the missing documents of each batch are rendered by a process pool.
+    """
+    with ProcessPoolExecutor(workers) if workers > 1 else nullcontext() as pool:
+        batch = []
+        for bill in bills.iterator(chunk_size=BATCH_SIZE):
+            batch.append(bill)
+            if len(batch) == BATCH_SIZE:
+                yield from _render_batch(kind, batch, extension, pool)
+                batch = []
+        yield from _render_batch(kind, batch, extension, pool)
+
+
+class _ZipStream:
+    """Unseekable file the ZIP is written into; the bytes are taken out after every bill"""
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def take(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def zip_bills(kind, start_date, end_date, extension='pdf', workers=1, progress=None):
+    """
+    Generator of the bytes of a ZIP holding one <kind>-bill-<billno>.<extension> per bill of the range,
+    produced as the bills are rendered. 'progress' is called with (bills done, total) after each bill.
+    """
+    bills = bills_in_range(kind, start_date, end_date)
+    total = bills.count()
+    stream = _ZipStream()
+    with zipfile.ZipFile(stream, 'w', compression=COMPRESSION[extension]) as archive:
+        for done, (bill, content) in enumerate(render_bills(kind, bills, extension, workers), 1):
+            if extension == 'html':
+                content = HTML_PAGE.format(title=escape(f'{kind} bill {bill.billno}'), document=content.decode()).encode()
+            entry = zipfile.ZipInfo(f'{kind}-bill-{bill.billno}.{extension}', timezone.localtime(bill.time).timetuple()[:6])
+            entry.compress_type = COMPRESSION[extension]
+            archive.writestr(entry, content)
+            yield stream.take()
+            if progress:
+                progress(done, total)
+    yield stream.take()
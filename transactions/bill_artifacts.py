@@ -0,0 +1,201 @@
+import glob
+import os
+import tempfile
+
+from django.conf import settings
+from django.shortcuts import get_object_or_404
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from . import taxes
+from .models import PurchaseBillDetails, SaleBillDetails
+from .number_to_words import amount_in_words
+from .pdf import PDFDocument, PAGE_HEIGHT
+
+
+# Rendered bills, kept on disk as <kind>-<billno>-v<details version>-f<FORMAT>.<html|pdf>.
+# A bill is immutable once issued except for its details (eway, vehicle, taxes...): posting them bumps
+# the details version and discards the files, so the next view renders again. Bump FORMAT whenever the
+# document templates or the PDF layout change. Files of deleted bills are left behind; the directory
+# can be emptied at any time.
+FORMAT = 3
+
+DETAILS_MODELS = {
+    'purchase': PurchaseBillDetails,
+    'sale': SaleBillDetails,
+}
+DOCUMENT_TEMPLATES = {
+    'purchase': 'bill/purchase_bill_document.html',
+    'sale': 'bill/sale_bill_document.html',
+}
+TITLES = {
+    'purchase': ('GIIM', 'INVOICE - PURCHASE'),
+    'sale': ('GITC', 'TAX INVOICE - SALE'),
+}
+
+def bill_details(kind, billno):
+    """Details row of a bill with the bill (and its supplier) joined, or 404"""
+    related = ['billno__supplier'] if kind == 'purchase' else ['billno']
+    return get_object_or_404(DETAILS_MODELS[kind].objects.select_related(*related), billno=billno)
+
+
+def artifact_path(kind, billno, version, extension):
+    return os.path.join(settings.BILL_ARTIFACT_DIR, f'{kind}-{billno}-v{version}-f{FORMAT}.{extension}')
+
+
+def write_artifact(path, content):
+    # written aside and renamed, so a concurrent reader never sees half a file
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    handle, temporary = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    with os.fdopen(handle, 'wb') as output:
+        output.write(content)
+    os.replace(temporary, path)
+
+
+def read_artifact(path):
+    """Content of a rendered file, None when it was not rendered yet"""
+    try:
+        with open(path, 'rb') as cached:
+            return cached.read()
+    except FileNotFoundError:
+        return None
+
+
+def _cached(path, build):
+    content = read_artifact(path)
+    if content is None:
+        content = build()
+        write_artifact(path, content)
+    return content
+
+
+def details_of(kind, bill):
+    """Details row of a bill whose details were prefetched; an empty one for bills that never had any"""
+    related = 'purchasedetailsbillno' if kind == 'purchase' else 'saledetailsbillno'
+    for details in getattr(bill, related).all():
+        return details
+    return DETAILS_MODELS[kind](billno=bill)
+
+
+def document_context(kind, details, items=None):
+    """Everything the bill's document template and PDF need; reads the items (with their stock) unless given"""
+    bill = details.billno
+    items = list(items if items is not None else bill.get_items_list().select_related('stock'))
+    context = {'bill': bill, 'items': items, 'billdetails': details}
+    if kind == 'sale':
+        context['taxes'] = bill_taxes = taxes.bill_taxes(bill)
+        context['net_in_words'] = amount_in_words(bill_taxes.net_payable)
+    return context
+
+
+def document_html(kind, details):
+    """The printable part of the bill page, as safe HTML"""
+    def build():
+        return render_html(kind, document_context(kind, details))
+    return mark_safe(_cached(artifact_path(kind, details.billno_id, details.version, 'html'), build).decode())
+
+
+def document_pdf(kind, details):
+    """Path of the bill's PDF, rendered first if needed"""
+    path = artifact_path(kind, details.billno_id, details.version, 'pdf')
+    if not os.path.exists(path):
+        write_artifact(path, render_pdf(kind, document_context(kind, details)))
+    return path
+
+
+def discard(kind, billno):
+    """Removes every rendered file of a bill, called when its details change"""
+    for path in glob.glob(os.path.join(settings.BILL_ARTIFACT_DIR, f'{kind}-{billno}-v*')):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def _amount(value):
+    return f'{value:,.2f}'
+
+
+def render_html(kind, context):
+    return render_to_string(DOCUMENT_TEMPLATES[kind], context).encode()
+
+
+def render_pdf(kind, context):
+    """A4 PDF of a bill from its document context"""
+    bill, details, items = context['bill'], context['billdetails'], context['items']
+    party = bill.supplier if kind == 'purchase' else bill
+    company, heading = TITLES[kind]
+    document = PDFDocument(title=f'{heading} {bill.billno}')
+    left, right = 40, 555
+
+    y = PAGE_HEIGHT - 60
+    document.text(left, y, company, size=20, font='bold')
+    document.text(right - 150, y, heading, size=11, font='bold')
+    y -= 16
+    document.text(left, y, 'DEALERS IN : Products  |  971 Center Street, Umatilla, OR 97882  |  djangoims@mail.com', size=8)
+    y -= 10
+    document.line(left, y, right, y)
+
+    y -= 18
+    document.text(left, y, party.name, size=10, font='bold')
+    fields = [
+        ('INVOICE NO', bill.billno), ('DATE', bill.time.date()), ('EWAY NO', details.eway),
+        ('VEH NO', details.veh), ('DESTINATION', details.destination), ('PO NO', details.po),
+    ]
+    lines = [line for line in str(party.address).splitlines() if line.strip()] + [f'GSTIN : {party.gstin}']
+    for row, (label, value) in enumerate(fields):
+        line_y = y - row * 12
+        document.text(330, line_y, label, size=8, font='bold')
+        document.text(420, line_y, value or '', size=8)
+        if row < len(lines):
+            document.text(left, line_y - 12, lines[row], size=8)
+    y -= 12 * len(fields) + 12
+
+    def table_header(y):
+        document.line(left, y + 12, right, y + 12)
+        for x, label in ((left, 'SL'), (left + 30, 'DESCRIPTION')):
+            document.text(x, y, label, size=8, font='bold')
+        for x, label in ((380, 'QTY'), (465, 'RATE'), (right, 'AMOUNT')):
+            document.text(x - len(label) * 5, y, label, size=8, font='bold')
+        document.line(left, y - 5, right, y - 5)
+        return y - 18
+
+    y = table_header(y)
+    for number, item in enumerate(items, 1):
+        if y < 150:
+            document.new_page()
+            y = table_header(PAGE_HEIGHT - 60)
+        document.text(left, y, number, size=8)
+        document.text(left + 30, y, item.stock.name[:55], size=8)
+        document.text_right(380, y, item.quantity, size=8)
+        document.text_right(465, y, _amount(item.perprice), size=8)
+        document.text_right(right, y, _amount(item.totalprice), size=8)
+        y -= 13
+    document.line(left, y + 6, right, y + 6)
+
+    if kind == 'sale':
+        bill_taxes = context['taxes']
+        summary = (
+            [('Subtotal', bill_taxes.subtotal)]
+            + [(line.label, line.amount) for line in bill_taxes.lines if not line.withheld]
+            + [('Total after Tax', bill_taxes.gross)]
+            + [(line.label, line.amount) for line in bill_taxes.lines if line.withheld]
+            + [('Net Payable', bill_taxes.net_payable)]
+        )
+    else:
+        summary = [('Subtotal', sum(item.totalprice for item in items))] + [
+            (label, value) for label, value in (
+                ('VAT @ 15%', details.igst), ('WHT @ 2%', details.tcs), ('TOTAL', details.total),
+            ) if value is not None
+        ]
+    y -= 12
+    for label, value in summary:
+        document.text(340, y, label, size=9, font='bold')
+        document.text_right(right, y, _amount(value), size=9)
+        y -= 13
+    if context.get('net_in_words'):
+        document.text(left, y - 6, f"Amount in Words: {context['net_in_words']}", size=8, font='bold')
+
+    document.text(right - 90, 70, 'Authorized Signatory', size=8, font='bold')
+    document.line(right - 110, 82, right, 82)
+    return document.render()
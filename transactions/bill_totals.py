@@ -0,0 +1,37 @@
+from django.db.models import Count, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from .models import PurchaseBill, PurchaseItem, SaleBill, SaleItem
+
+
+# bill model -> (item model, reverse accessor from bill to its items)
+BILL_ITEMS = {
+    PurchaseBill: (PurchaseItem, 'purchasebillno'),
+    SaleBill: (SaleItem, 'salebillno'),
+}
+
+
+def bill_totals(items):
+    """(total_amount, item_count) for a list of unsaved line items with totalprice already set"""
+    return sum(item.totalprice for item in items), len(items)
+
+
+def sync_bill_totals(bill_model):
+    """Recomputes total_amount and item_count of every bill in one UPDATE, returns the number of bills"""
+    item_model, _ = BILL_ITEMS[bill_model]
+    per_bill = item_model.objects.filter(billno=OuterRef('pk')).values('billno')
+    return bill_model.objects.update(
+        total_amount=Coalesce(Subquery(per_bill.annotate(total=Sum('totalprice')).values('total')), Value(0)),
+        item_count=Coalesce(Subquery(per_bill.annotate(count=Count('id')).values('count')), Value(0)),
+    )
+
+
+def mismatched_bills(bill_model):
+    """Bills whose stored totals disagree with their items, annotated with 'actual_total' and 'actual_count'"""
+    _, related = BILL_ITEMS[bill_model]
+    return (
+        bill_model.objects
+        .annotate(actual_total=Coalesce(Sum(related + '__totalprice'), Value(0)), actual_count=Count(related))
+        .exclude(total_amount=F('actual_total'), item_count=F('actual_count'))
+        .order_by('billno')
+    )
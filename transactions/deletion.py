@@ -0,0 +1,60 @@
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Sum, Min
+from django.utils import timezone
+
+from inventory import ledger, locations, snapshots, events
+from inventory.models import Stock, StockLocation
+from inventory.movements import apply_stock_deltas
+from .models import PurchaseItem, SaleItem
+
+
+def _delete_bills(bills, item_model, stock_sign, counters, location_kind, kind):
+    """
+    Deletes the 'bills' queryset and reverses every stock movement they made, grouped per stock and location,
+    so the cost is a handful of statements whatever the number of bills or lines.
+    Returns the number of bills deleted.
+    """
+    with transaction.atomic():
+        totals = defaultdict(lambda: (0, 0))
+        at_locations = {}
+        for row in (
+            item_model.objects.filter(billno__in=bills.values('pk'))
+            .values('stock', 'location')
+            .annotate(qty=Sum('quantity'), amount=Sum('totalprice'))
+            .order_by()
+        ):
+            qty, amount = totals[row['stock']]
+            totals[row['stock']] = (qty + row['qty'], amount + row['amount'])
+            at_locations[row['stock'], row['location']] = row['qty']
+        totals = dict(totals)
+        earliest = bills.aggregate(earliest=Min('time'))['earliest']
+
+        # stock that was soft-deleted keeps its quantity, as before
+        apply_stock_deltas(
+            {stock_id: stock_sign * qty for stock_id, (qty, _) in totals.items()},
+            queryset=Stock.objects.filter(is_deleted=False),
+        )
+        locations.post_totals(
+            at_locations, location_kind, reverse=True, queryset=StockLocation.objects.filter(stock__is_deleted=False),
+        )
+        ledger.post_totals(totals, counters, reverse=True)
+        if earliest is not None:
+            snapshots.invalidate_from(timezone.localtime(earliest).date())
+        if events.broker.has_subscribers():
+            billnos = list(bills.values_list('pk', flat=True)[:2])
+            events.stock_moved(totals, billnos[0] if len(billnos) == 1 else None, kind)
+
+        _, deleted = bills.delete()
+    return deleted.get(bills.model._meta.label, 0)
+
+
+def delete_purchase_bills(bills):
+    """Deletes purchase bills and takes their quantities back out of stock"""
+    return _delete_bills(bills, PurchaseItem, -1, ledger.PURCHASED, locations.PURCHASED, 'purchase-deleted')
+
+
+def delete_sale_bills(bills):
+    """Deletes sale bills and puts their quantities back into stock"""
+    return _delete_bills(bills, SaleItem, 1, ledger.SOLD, locations.SOLD, 'sale-deleted')
@@ -1,5 +1,9 @@
+from collections import defaultdict
+
 from django import forms
-from django.forms import formset_factory
+from django.core.exceptions import ValidationError
+from django.forms import formset_factory, BaseFormSet
+from django.utils.functional import cached_property
 from .models import (
     Supplier, 
     PurchaseBill, 
@@ -9,7 +13,9 @@ from .models import (
     SaleItem,
     SaleBillDetails
 )
-from inventory.models import Stock
+from inventory.locations import held_at
+from inventory.models import Stock, Location
+from inventory.widgets import StockAutocompleteWidget
 
 
 # form used to select a supplier
@@ -27,20 +33,81 @@ class SelectSupplierForm(forms.Form):
     )
 
 
+# stock field that looks the submitted pk up in stocks preloaded by the formset instead of querying per line;
+# on its own it checks the pk with a single get(), the choices are never listed (see StockAutocompleteWidget)
+class StockChoiceField(forms.ModelChoiceField):
+    preloaded = None
+
+    def to_python(self, value):
+        if self.preloaded is None or value in self.empty_values:
+            return super().to_python(value)
+        try:
+            return self.preloaded[int(value)]
+        except (KeyError, ValueError, TypeError):
+            raise ValidationError(self.error_messages['invalid_choice'], code='invalid_choice', params={'value': value})
+
+
+# location field of a line, looked up the same way in the locations the formset loaded once
+class LocationChoiceField(StockChoiceField):
+    pass
+
+
+# skips the model-level ForeignKey checks of 'stock' and 'location', their fields have already confirmed they exist
+class StockLineFormMixin:
+    def _get_validation_exclusions(self):
+        exclude = super()._get_validation_exclusions()
+        for name in ('stock', 'location'):
+            if self.fields[name].preloaded is not None:
+                exclude.add(name)
+        return exclude
+
+
+# formset that validates the stock of every line with a single query, plus one for their quantities per location
+class BaseStockLineFormSet(BaseFormSet):
+    def full_clean(self):
+        if self.is_bound:
+            pks = set()
+            for form in self.forms:
+                value = form.data.get(form.add_prefix('stock'))
+                if value and str(value).isdigit():
+                    pks.add(int(value))
+            stocks = Stock.objects.filter(is_deleted=False).prefetch_related('locations').in_bulk(pks)
+            for form in self.forms:
+                form.fields['stock'].preloaded = stocks
+                form.fields['stock'].widget.preloaded = stocks                  # re-rendering after an error needs no query either
+        super().full_clean()
+
+    @cached_property
+    def locations(self):
+        return Location.objects.in_bulk()
+
+    # every line lists the same few locations, read once for the whole formset; the default one comes first
+    def _construct_form(self, i, **kwargs):
+        form = super()._construct_form(i, **kwargs)
+        field = form.fields['location']
+        field.preloaded = self.locations
+        field.choices = [(pk, str(location)) for pk, location in self.locations.items()]
+        field.initial = next(iter(self.locations), None)
+        return form
+
+
 # form used to render a single stock item form
-class PurchaseItemForm(forms.ModelForm):
+class PurchaseItemForm(StockLineFormMixin, forms.ModelForm):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.fields['stock'].queryset = Stock.objects.filter(is_deleted=False)
         self.fields['stock'].widget.attrs.update({'class': 'textinput form-control setprice stock', 'required': 'true'})
+        self.fields['location'].widget.attrs.update({'class': 'textinput form-control location', 'required': 'true'})
         self.fields['quantity'].widget.attrs.update({'class': 'textinput form-control setprice quantity', 'min': '0', 'required': 'true'})
         self.fields['perprice'].widget.attrs.update({'class': 'textinput form-control setprice price', 'min': '0', 'required': 'true'})
     class Meta:
         model = PurchaseItem
-        fields = ['stock', 'quantity', 'perprice']
+        fields = ['stock', 'location', 'quantity', 'perprice']
+        field_classes = {'stock': StockChoiceField, 'location': LocationChoiceField}
+        widgets = {'stock': StockAutocompleteWidget}
 
 # formset used to render multiple 'PurchaseItemForm'
-PurchaseItemFormset = formset_factory(PurchaseItemForm, extra=1)
+PurchaseItemFormset = formset_factory(PurchaseItemForm, formset=BaseStockLineFormSet, extra=1)
 
 # form used to accept the other details for purchase bill
 class PurchaseDetailsForm(forms.ModelForm):
@@ -91,19 +158,63 @@ class SaleForm(forms.ModelForm):
         }
 
 # form used to render a single stock item form
-class SaleItemForm(forms.ModelForm):
+class SaleItemForm(StockLineFormMixin, forms.ModelForm):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.fields['stock'].queryset = Stock.objects.filter(is_deleted=False)
         self.fields['stock'].widget.attrs.update({'class': 'textinput form-control setprice stock', 'required': 'true'})
+        self.fields['location'].widget.attrs.update({'class': 'textinput form-control setprice location', 'required': 'true'})
         self.fields['quantity'].widget.attrs.update({'class': 'textinput form-control setprice quantity', 'min': '0', 'required': 'true'})
         self.fields['perprice'].widget.attrs.update({'class': 'textinput form-control setprice price', 'min': '0', 'required': 'true'})
     class Meta:
         model = SaleItem
-        fields = ['stock', 'quantity', 'perprice']
+        fields = ['stock', 'location', 'quantity', 'perprice']
+        field_classes = {'stock': StockChoiceField, 'location': LocationChoiceField}
+        widgets = {'stock': StockAutocompleteWidget}
+
+# sale lines may not take more out of a location than it holds; lines of the same stock and location
+# are checked together, against the rows prefetched with the stocks, and again by the view when the
+# sale's guarded update finds a location short
+class BaseSaleLineFormSet(BaseStockLineFormSet):
+    def clean(self):
+        super().clean()
+        if any(self.errors):
+            return
+        lines = self._lines()
+        self.check_held({(row.stock_id, row.location_id): row.quantity for stock, _ in lines for row in stock.locations.all()})
+
+    def _lines(self):
+        # {(stock, location): [forms]} of the lines that take something
+        lines = defaultdict(list)
+        for form in self.forms:
+            stock, location, quantity = (form.cleaned_data.get(name) for name in ('stock', 'location', 'quantity'))
+            if stock is not None and location is not None and quantity:
+                lines[stock, location].append(form)
+        return lines
+
+    def check_held(self, held):
+        """Adds an error to the lines taking more than {(stock_id, location_id): quantity} holds, returns whether any did"""
+        short = False
+        for (stock, location), forms in self._lines().items():
+            quantity = sum(form.cleaned_data['quantity'] for form in forms)
+            available = held.get((stock.pk, location.pk), 0)
+            if quantity > available:
+                short = True
+                for form in forms:
+                    form.add_error('quantity', f"Only {available} of {stock.name} at {location}.")
+        return short
+
+    def recheck_held(self):
+        """Checks the lines again against the quantities held now, after the sale's guarded update fell short"""
+        stock_ids = {stock.pk for stock, _ in self._lines()}
+        return self.check_held({
+            (stock_id, location_id): quantity
+            for stock_id, per_location in held_at(stock_ids).items() for location_id, quantity in per_location.items()
+        })
+
 
 # formset used to render multiple 'SaleItemForm'
-SaleItemFormset = formset_factory(SaleItemForm, extra=1)
+SaleItemFormset = formset_factory(SaleItemForm, formset=BaseSaleLineFormSet, extra=1)
 
 # form used to accept the other details for sales bill
 class SaleDetailsForm(forms.ModelForm):
@@ -0,0 +1,54 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+
+from inventory.locations import default_location_id
+from inventory.models import Stock
+from transactions.models import Supplier
+
+
+class Command(BaseCommand):
+    help = "Posts purchase and sale bills of growing size and prints the SQL statements each one costs (rolled back afterwards)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lines', nargs='+', type=int, default=[1, 10, 100, 500], help="lines per bill")
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"{'lines':>6} {'purchase':>9} {'sale':>6} {'seconds':>8}")
+        with override_settings(ALLOWED_HOSTS=['testserver']):
+            for lines in options['lines']:
+                with transaction.atomic():
+                    purchase, sale, elapsed = self.post_bills(lines)
+                    transaction.set_rollback(True)
+                self.stdout.write(f"{lines:>6} {purchase:>9} {sale:>6} {elapsed:>8.3f}")
+
+    def post_bills(self, lines):
+        stocks = Stock.objects.bulk_create(Stock(name=f"bench-line-{lines}-{n}", quantity=0) for n in range(lines))
+        supplier = Supplier.objects.create(
+            name="Benchmark", phone="9999999999", address="-", email="bench@example.com", gstin="BENCHMARK000000"
+        )
+        client = Client()
+        started = time.perf_counter()
+
+        location = default_location_id()
+        purchase = {'form-TOTAL_FORMS': str(lines), 'form-INITIAL_FORMS': '0'}
+        for n, stock in enumerate(stocks):
+            purchase.update({
+                f'form-{n}-stock': stock.pk, f'form-{n}-location': location, f'form-{n}-quantity': 5, f'form-{n}-perprice': 3,
+            })
+        with CaptureQueriesContext(connection) as purchase_queries:
+            response = client.post(f'/transactions/purchases/new/{supplier.pk}/', purchase)
+        assert response.status_code == 302, response.status_code
+
+        sale = dict(purchase, name='Benchmark', phone='0000000000', address='-', email='bench@example.com', gstin='-')
+        for n in range(lines):
+            sale[f'form-{n}-quantity'] = 2
+        with CaptureQueriesContext(connection) as sale_queries:
+            response = client.post('/transactions/sales/new', sale)
+        assert response.status_code == 302, response.status_code
+
+        elapsed = time.perf_counter() - started
+        return len(purchase_queries.captured_queries), len(sale_queries.captured_queries), elapsed
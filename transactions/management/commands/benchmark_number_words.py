@@ -0,0 +1,44 @@
+import random
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+
+from transactions.number_to_words import amount_in_words, number_to_words, _amount_in_words
+
+
+class Command(BaseCommand):
+    help = "Times number_to_words / amount_in_words on bill-like amounts, with a cold and a warm cache"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--calls', type=int, default=100000)
+        parser.add_argument('--distinct', type=int, default=2000, help="distinct amounts, batch prints repeat the same totals")
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        calls = options['calls']
+        amounts = [Decimal(rng.randrange(1, 10 ** 9)) / 100 for _ in range(options['distinct'])]
+        workload = [rng.choice(amounts) for _ in range(calls)]
+        wholes = [int(amount) for amount in workload]
+
+        def timed(label, function, values):
+            started = time.perf_counter()
+            for value in values:
+                function(value)
+            elapsed = time.perf_counter() - started
+            self.stdout.write(f"{label:<34} {elapsed * 1e6 / len(values):>8.2f} us/call")
+
+        timed("number_to_words (international)", number_to_words, wholes)
+        timed("number_to_words (indian)", lambda n: number_to_words(n, 'indian'), wholes)
+        _amount_in_words.cache_clear()
+        timed("amount_in_words, every value new", amount_in_words, amounts)
+        timed("amount_in_words, cached workload", amount_in_words, workload)
+        info = _amount_in_words.cache_info()
+        self.stdout.write(f"cache: {info.hits} hits, {info.misses} misses, {info.currsize} entries")
+
+        try:
+            from num2words import num2words
+        except ImportError:
+            return
+        timed("num2words package (for reference)", lambda value: num2words(value, lang='en'), workload[:calls // 10 or 1])
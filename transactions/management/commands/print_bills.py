@@ -0,0 +1,47 @@
+import os
+import time
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from transactions.batch_printing import KINDS, COMPRESSION, zip_bills
+
+
+def _date(value):
+    return datetime.strptime(value, '%Y-%m-%d').date()
+
+
+class Command(BaseCommand):
+    help = "Writes every purchase or sale bill of a date range into one ZIP of PDF (or HTML) documents"
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=sorted(KINDS))
+        parser.add_argument('--start-date', type=_date, required=True, help="first day, YYYY-MM-DD")
+        parser.add_argument('--end-date', type=_date, required=True, help="last day, YYYY-MM-DD")
+        parser.add_argument('--format', choices=sorted(COMPRESSION), default='pdf')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="rendering processes")
+        parser.add_argument('--output', help="ZIP file to write, <kind>-bills-<start>-<end>.zip by default")
+
+    def handle(self, *args, **options):
+        kind, start_date, end_date = options['kind'], options['start_date'], options['end_date']
+        if end_date < start_date:
+            raise CommandError("--end-date is before --start-date")
+        output = options['output'] or f"{kind}-bills-{start_date}-{end_date}.zip"
+        started = time.perf_counter()
+        count = 0
+
+        def progress(done, total):
+            nonlocal count
+            count = done
+            if done == total or done % 50 == 0:
+                self.stderr.write(f"\r{done}/{total} bills", ending='')
+                self.stderr.flush()
+
+        with open(output, 'wb') as archive:
+            for chunk in zip_bills(kind, start_date, end_date, options['format'], options['workers'], progress):
+                archive.write(chunk)
+        if count:
+            self.stderr.write('')                                       # ends the progress line
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {count} {kind} bills to {output} in {time.perf_counter() - started:.1f}s"
+        ))
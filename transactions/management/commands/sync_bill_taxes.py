@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from inventory.reports import DEFAULT_START_DATE
+from transactions.models import SaleBill
+from transactions.taxes import STORE_BATCH_SIZE, store_taxes, tax_summary
+
+
+class Command(BaseCommand):
+    help = "Computes and stores the tax lines of sale bills that have none yet (or of all of them) and prints the totals per tax"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help="recompute every bill, e.g. after SALE_TAXES changed")
+
+    def handle(self, *args, **options):
+        bills = SaleBill.objects.only('pk', 'total_amount', 'net_payable').order_by('pk')
+        if not options['all']:
+            bills = bills.filter(net_payable__isnull=True)
+
+        count = 0
+        batch = []
+        for bill in bills.iterator(chunk_size=STORE_BATCH_SIZE):
+            batch.append(bill)
+            if len(batch) == STORE_BATCH_SIZE:
+                store_taxes(batch)
+                count += len(batch)
+                batch = []
+        if batch:
+            store_taxes(batch)
+            count += len(batch)
+        self.stdout.write(f"Stored the taxes of {count} sale bills")
+
+        for row in tax_summary(DEFAULT_START_DATE, timezone.localdate()):
+            self.stdout.write(f"{row['label']}: {row['amount']} on {row['base']} over {row['bills']} bills")
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from transactions.bill_totals import sync_bill_totals, mismatched_bills
+from transactions.models import PurchaseBill, SaleBill
+
+
+class Command(BaseCommand):
+    help = "Backfills the stored total_amount/item_count of purchase and sale bills and verifies them against their items"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verify-only', action='store_true', help="only report bills whose stored totals are wrong")
+
+    def handle(self, *args, **options):
+        mismatches = 0
+        for model in (PurchaseBill, SaleBill):
+            if not options['verify_only']:
+                with transaction.atomic():
+                    count = sync_bill_totals(model)
+                self.stdout.write(f"Updated totals of {count} {model._meta.verbose_name_plural}")
+
+            for bill in mismatched_bills(model):
+                mismatches += 1
+                self.stderr.write(
+                    f"{model.__name__} {bill.billno}: stored {bill.total_amount}/{bill.item_count}, "
+                    f"expected {bill.actual_total}/{bill.actual_count}"
+                )
+        if mismatches:
+            raise CommandError(f"{mismatches} bills have wrong stored totals")
+        self.stdout.write(self.style.SUCCESS("Bill totals match their items"))
@@ -0,0 +1,47 @@
+# Generated by Django 4.2.23 on 2026-10-18 02:29
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def fill_bill_totals(apps, schema_editor):
+    for bill_name, item_name in (('PurchaseBill', 'PurchaseItem'), ('SaleBill', 'SaleItem')):
+        bill_model = apps.get_model('transactions', bill_name)
+        item_model = apps.get_model('transactions', item_name)
+        per_bill = item_model.objects.filter(billno=OuterRef('pk')).values('billno')
+        bill_model.objects.update(
+            total_amount=Coalesce(Subquery(per_bill.annotate(total=Sum('totalprice')).values('total')), Value(0)),
+            item_count=Coalesce(Subquery(per_bill.annotate(count=Count('id')).values('count')), Value(0)),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0005_bill'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='purchasebill',
+            name='item_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='purchasebill',
+            name='total_amount',
+            field=models.IntegerField(db_index=True, default=0),
+        ),
+        migrations.AddField(
+            model_name='salebill',
+            name='item_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='salebill',
+            name='total_amount',
+            field=models.IntegerField(db_index=True, default=0),
+        ),
+        migrations.RunPython(fill_bill_totals, migrations.RunPython.noop),
+    ]
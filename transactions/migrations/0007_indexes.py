@@ -0,0 +1,41 @@
+# Generated by Django 4.2.23 on 2026-10-18 02:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0006_bill_totals'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='purchasebill',
+            index=models.Index(fields=['-time', '-billno'], name='purchasebill_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='purchasebill',
+            index=models.Index(fields=['supplier', '-time', '-billno'], name='purchasebill_supplier_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='purchaseitem',
+            index=models.Index(fields=['stock', 'billno'], name='purchaseitem_stock_bill_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='salebill',
+            index=models.Index(fields=['-time', '-billno'], name='salebill_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='saleitem',
+            index=models.Index(fields=['stock', 'billno'], name='saleitem_stock_bill_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='supplier',
+            index=models.Index(fields=['name'], name='supplier_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='supplier',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['name', 'id'], name='supplier_active_name_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.23 on 2026-10-18 02:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0007_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='purchasebilldetails',
+            name='version',
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.AddField(
+            model_name='salebilldetails',
+            name='version',
+            field=models.PositiveIntegerField(default=1),
+        ),
+    ]
@@ -0,0 +1,127 @@
+# Generated by Django 4.2.23 on 2026-10-18 02:59
+
+from decimal import Decimal, InvalidOperation
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+AMOUNT_FIELDS = ('cgst', 'sgst', 'igst', 'cess', 'tcs', 'total')
+
+
+def _amount(text):
+    # "1,234.5" -> "1234.50"; anything that is not a number is dropped
+    if text is None:
+        return None
+    try:
+        value = Decimal(text.replace(',', '').strip())
+    except InvalidOperation:
+        return None
+    return str(value.quantize(Decimal('0.01'))) if value.is_finite() and abs(value) < 10 ** 12 else None
+
+
+def clean_amounts(apps, schema_editor):
+    # the details amounts were free text, make them valid decimals before the columns change type
+    for name in ('PurchaseBillDetails', 'SaleBillDetails'):
+        model = apps.get_model('transactions', name)
+        for row in model.objects.values('pk', *AMOUNT_FIELDS).iterator():
+            cleaned = {field: _amount(row[field]) for field in AMOUNT_FIELDS}
+            if any(cleaned[field] != row[field] for field in AMOUNT_FIELDS):
+                model.objects.filter(pk=row['pk']).update(**cleaned)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0008_details_version'),
+    ]
+
+    operations = [
+        migrations.RunPython(clean_amounts, migrations.RunPython.noop),
+        migrations.AddField(
+            model_name='salebill',
+            name='net_payable',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=14, null=True),
+        ),
+        migrations.AlterField(
+            model_name='purchasebilldetails',
+            name='cess',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=14, null=True),
+        ),
+        migrations.AlterField(
+            model_name='purchasebilldetails',
+            name='cgst',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=14, null=True),
+        ),
+        migrations.AlterField(
+            model_name='purchasebilldetails',
+            name='igst',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=14, null=True),
+        ),
+        migrations.AlterField(
+            model_name='purchasebilldetails',
+            name='sgst',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=14, null=True),
+        ),
+        migrations.AlterField(
+            model_name='purchasebilldetails',
+            name='tcs',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=14, null=True),
+        ),
+        migrations.AlterField(
+            model_name='purchasebilldetails',
+            name='total',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=14, null=True),
+        ),
+        migrations.AlterField(
+            model_name='salebilldetails',
+            name='cess',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=14, null=True),
+        ),
+        migrations.AlterField(
+            model_name='salebilldetails',
+            name='cgst',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=14, null=True),
+        ),
+        migrations.AlterField(
+            model_name='salebilldetails',
+            name='igst',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=14, null=True),
+        ),
+        migrations.AlterField(
+            model_name='salebilldetails',
+            name='sgst',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=14, null=True),
+        ),
+        migrations.AlterField(
+            model_name='salebilldetails',
+            name='tcs',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=14, null=True),
+        ),
+        migrations.AlterField(
+            model_name='salebilldetails',
+            name='total',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=14, null=True),
+        ),
+        migrations.CreateModel(
+            name='SaleBillTax',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.PositiveSmallIntegerField()),
+                ('code', models.CharField(max_length=20)),
+                ('label', models.CharField(max_length=50)),
+                ('rate', models.DecimalField(decimal_places=4, max_digits=7)),
+                ('base', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('withheld', models.BooleanField(default=False)),
+                ('billno', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='taxes', to='transactions.salebill')),
+            ],
+            options={
+                'ordering': ['position'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='salebilltax',
+            constraint=models.UniqueConstraint(fields=('billno', 'code'), name='salebilltax_bill_code_unique'),
+        ),
+    ]
@@ -0,0 +1,69 @@
+# Generated by Django 4.2.23 on 2026-10-18 03:42
+
+from django.db import migrations, models
+from django.db.models import Sum, Max
+import django.db.models.deletion
+
+
+def fill_item_locations(apps, schema_editor):
+    # every line moved stock at the default location, whose counters are rebuilt from them
+    Location = apps.get_model('inventory', 'Location')
+    StockLocation = apps.get_model('inventory', 'StockLocation')
+    location = Location.objects.order_by('pk').first()
+
+    rows = {}
+    for name, counter in (('PurchaseItem', 'purchased_qty'), ('SaleItem', 'sold_qty')):
+        model = apps.get_model('transactions', name)
+        model.objects.update(location=location)
+        for row in model.objects.values('stock').annotate(qty=Sum('quantity'), last=Max('billno__time')).order_by():
+            entry = rows.setdefault(row['stock'], StockLocation(stock_id=row['stock'], location=location))
+            setattr(entry, counter, row['qty'])
+            if entry.last_movement is None or row['last'] > entry.last_movement:
+                entry.last_movement = row['last']
+    StockLocation.objects.bulk_create(
+        rows.values(),
+        update_conflicts=True,
+        unique_fields=['location', 'stock'],
+        update_fields=['purchased_qty', 'sold_qty', 'last_movement'],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0007_locations'),
+        ('transactions', '0009_taxes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='purchaseitem',
+            name='location',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='purchaseitems', to='inventory.location'),
+        ),
+        migrations.AddField(
+            model_name='saleitem',
+            name='location',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='saleitems', to='inventory.location'),
+        ),
+        migrations.RunPython(fill_item_locations, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='purchaseitem',
+            name='location',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='purchaseitems', to='inventory.location'),
+        ),
+        migrations.AlterField(
+            model_name='saleitem',
+            name='location',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='saleitems', to='inventory.location'),
+        ),
+        migrations.AddIndex(
+            model_name='purchaseitem',
+            index=models.Index(fields=['location', 'stock'], name='purchaseitem_location_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='saleitem',
+            index=models.Index(fields=['location', 'stock'], name='saleitem_location_idx'),
+        ),
+    ]
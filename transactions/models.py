@@ -1,5 +1,5 @@
 from django.db import models
-from inventory.models import Stock
+from inventory.models import Stock, Location
 
 #contains suppliers
 class Supplier(models.Model):
@@ -11,6 +11,12 @@ class Supplier(models.Model):
     gstin = models.CharField(max_length=15, unique=True)
     is_deleted = models.BooleanField(default=False)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['name'], name='supplier_name_idx'),        # SupplierView looks suppliers up by name
+            models.Index(fields=['name', 'id'], name='supplier_active_name_idx', condition=models.Q(is_deleted=False)),
+        ]
+
     def __str__(self):
 	    return self.name
 
@@ -20,28 +26,43 @@ class PurchaseBill(models.Model):
     billno = models.AutoField(primary_key=True)
     time = models.DateTimeField(auto_now=True)
     supplier = models.ForeignKey(Supplier, on_delete = models.CASCADE, related_name='purchasesupplier')
+    total_amount = models.IntegerField(default=0, db_index=True)        # sum of the items' totalprice, set when the bill is created
+    item_count = models.IntegerField(default=0)
+
+    # listings page on (time, billno), newest first, for all bills and per supplier
+    class Meta:
+        indexes = [
+            models.Index(fields=['-time', '-billno'], name='purchasebill_time_idx'),
+            models.Index(fields=['supplier', '-time', '-billno'], name='purchasebill_supplier_time_idx'),
+        ]
 
     def __str__(self):
 	    return "Bill no: " + str(self.billno)
 
+    # served from the prefetch cache when the listing prefetched 'purchasebillno'
     def get_items_list(self):
-        return PurchaseItem.objects.filter(billno=self)
+        return self.purchasebillno.all()
 
+    # stored on the bill, see 'total_amount'
     def get_total_price(self):
-        purchaseitems = PurchaseItem.objects.filter(billno=self)
-        total = 0
-        for item in purchaseitems:
-            total += item.totalprice
-        return total
+        return self.total_amount
 
 #contains the purchase stocks made
 class PurchaseItem(models.Model):
     billno = models.ForeignKey(PurchaseBill, on_delete = models.CASCADE, related_name='purchasebillno')
     stock = models.ForeignKey(Stock, on_delete = models.CASCADE, related_name='purchaseitem')
+    location = models.ForeignKey(Location, on_delete = models.PROTECT, related_name='purchaseitems')
     quantity = models.IntegerField(default=1)
     perprice = models.IntegerField(default=1)
     totalprice = models.IntegerField(default=1)
 
+    # movements of a stock, joined to their bills; and of the stocks at a location
+    class Meta:
+        indexes = [
+            models.Index(fields=['stock', 'billno'], name='purchaseitem_stock_bill_idx'),
+            models.Index(fields=['location', 'stock'], name='purchaseitem_location_idx'),
+        ]
+
     def __str__(self):
 	    return "Bill no: " + str(self.billno.billno) + ", Item = " + self.stock.name
 
@@ -54,12 +75,13 @@ class PurchaseBillDetails(models.Model):
     destination = models.CharField(max_length=50, blank=True, null=True)
     po = models.CharField(max_length=50, blank=True, null=True)
     
-    cgst = models.CharField(max_length=50, blank=True, null=True)
-    sgst = models.CharField(max_length=50, blank=True, null=True)
-    igst = models.CharField(max_length=50, blank=True, null=True)
-    cess = models.CharField(max_length=50, blank=True, null=True)
-    tcs = models.CharField(max_length=50, blank=True, null=True)
-    total = models.CharField(max_length=50, blank=True, null=True)
+    cgst = models.DecimalField(max_digits=14, decimal_places=2, blank=True, null=True)
+    sgst = models.DecimalField(max_digits=14, decimal_places=2, blank=True, null=True)
+    igst = models.DecimalField(max_digits=14, decimal_places=2, blank=True, null=True)
+    cess = models.DecimalField(max_digits=14, decimal_places=2, blank=True, null=True)
+    tcs = models.DecimalField(max_digits=14, decimal_places=2, blank=True, null=True)
+    total = models.DecimalField(max_digits=14, decimal_places=2, blank=True, null=True)
+    version = models.PositiveIntegerField(default=1)                    # bumped on every edit, keys the rendered bill files
 
     def __str__(self):
 	    return "Bill no: " + str(self.billno.billno)
@@ -75,31 +97,65 @@ class SaleBill(models.Model):
     address = models.CharField(max_length=200)
     email = models.EmailField(max_length=254)
     gstin = models.CharField(max_length=15)
+    total_amount = models.IntegerField(default=0, db_index=True)        # sum of the items' totalprice, set when the bill is created
+    item_count = models.IntegerField(default=0)
+    net_payable = models.DecimalField(max_digits=14, decimal_places=2, blank=True, null=True)  # after the taxes in 'taxes', None before they were stored
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-time', '-billno'], name='salebill_time_idx'),
+        ]
 
     def __str__(self):
 	    return "Bill no: " + str(self.billno)
 
+    # served from the prefetch cache when the listing prefetched 'salebillno'
     def get_items_list(self):
-        return SaleItem.objects.filter(billno=self)
-        
+        return self.salebillno.all()
+
+    # stored on the bill, see 'total_amount'
     def get_total_price(self):
-        saleitems = SaleItem.objects.filter(billno=self)
-        total = 0
-        for item in saleitems:
-            total += item.totalprice
-        return total
+        return self.total_amount
 
 #contains the sale stocks made
 class SaleItem(models.Model):
     billno = models.ForeignKey(SaleBill, on_delete = models.CASCADE, related_name='salebillno')
     stock = models.ForeignKey(Stock, on_delete = models.CASCADE, related_name='saleitem')
+    location = models.ForeignKey(Location, on_delete = models.PROTECT, related_name='saleitems')
     quantity = models.IntegerField(default=1)
     perprice = models.IntegerField(default=1)
     totalprice = models.IntegerField(default=1)
 
+    # movements of a stock, joined to their bills; and of the stocks at a location
+    class Meta:
+        indexes = [
+            models.Index(fields=['stock', 'billno'], name='saleitem_stock_bill_idx'),
+            models.Index(fields=['location', 'stock'], name='saleitem_location_idx'),
+        ]
+
     def __str__(self):
 	    return "Bill no: " + str(self.billno.billno) + ", Item = " + self.stock.name
 
+#contains the tax lines of a sale bill, computed by transactions/taxes.py when the bill is made
+class SaleBillTax(models.Model):
+    billno = models.ForeignKey(SaleBill, on_delete = models.CASCADE, related_name='taxes')
+    position = models.PositiveSmallIntegerField()
+    code = models.CharField(max_length=20)
+    label = models.CharField(max_length=50)
+    rate = models.DecimalField(max_digits=7, decimal_places=4)
+    base = models.DecimalField(max_digits=14, decimal_places=2)
+    amount = models.DecimalField(max_digits=14, decimal_places=2)
+    withheld = models.BooleanField(default=False)                       # deducted from the amount payable instead of added
+
+    class Meta:
+        ordering = ['position']
+        constraints = [
+            models.UniqueConstraint(fields=['billno', 'code'], name='salebilltax_bill_code_unique'),
+        ]
+
+    def __str__(self):
+	    return "Bill no: " + str(self.billno_id) + ", " + self.label
+
 #contains the other details in the sales bill
 class SaleBillDetails(models.Model):
     billno = models.ForeignKey(SaleBill, on_delete = models.CASCADE, related_name='saledetailsbillno')
@@ -109,12 +165,13 @@ class SaleBillDetails(models.Model):
     destination = models.CharField(max_length=50, blank=True, null=True)
     po = models.CharField(max_length=50, blank=True, null=True)
     
-    cgst = models.CharField(max_length=50, blank=True, null=True)
-    sgst = models.CharField(max_length=50, blank=True, null=True)
-    igst = models.CharField(max_length=50, blank=True, null=True)
-    cess = models.CharField(max_length=50, blank=True, null=True)
-    tcs = models.CharField(max_length=50, blank=True, null=True)
-    total = models.CharField(max_length=50, blank=True, null=True)
+    cgst = models.DecimalField(max_digits=14, decimal_places=2, blank=True, null=True)
+    sgst = models.DecimalField(max_digits=14, decimal_places=2, blank=True, null=True)
+    igst = models.DecimalField(max_digits=14, decimal_places=2, blank=True, null=True)
+    cess = models.DecimalField(max_digits=14, decimal_places=2, blank=True, null=True)
+    tcs = models.DecimalField(max_digits=14, decimal_places=2, blank=True, null=True)
+    total = models.DecimalField(max_digits=14, decimal_places=2, blank=True, null=True)
+    version = models.PositiveIntegerField(default=1)                    # bumped on every edit, keys the rendered bill files
 
     def __str__(self):
 	    return "Bill no: " + str(self.billno.billno)
@@ -1,47 +1,97 @@
-from django import template
 import math
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+from functools import lru_cache
 
-register = template.Library()
 
-NUM_NAMES = {
-    0: 'Zero', 1: 'One', 2: 'Two', 3:'Three', 4:'Four', 5:'Five', 6:'Six', 7:'Seven', 8:'Eight', 9:'Nine', 10:'Ten',
-    11:'Eleven',12:'Twelve',13:'Thirteen',14:'Fourteen',15:'Fifteen',16:'Sixteen',17:'Seventeen',18:'Eighteen',19:'Nineteen'
-}
-TENS_NAMES = {
-    2:'Twenty',3:'Thirty',4:'Forty',5:'Fifty',6:'Sixty',7:'Seventy',8:'Eighty',9:'Ninety'
+# Whole numbers and amounts in English words, table-driven: every number below a thousand is spelled once
+# at import, larger ones are split on the scale table of the numbering system. Above the largest scale the
+# count of that scale is spelled recursively ("One Thousand Trillion", "One Thousand Two Hundred Crore"), so any
+# size works.
+ONES = [
+    'Zero', 'One', 'Two', 'Three', 'Four', 'Five', 'Six', 'Seven', 'Eight', 'Nine', 'Ten',
+    'Eleven', 'Twelve', 'Thirteen', 'Fourteen', 'Fifteen', 'Sixteen', 'Seventeen', 'Eighteen', 'Nineteen',
+]
+TENS = ['', '', 'Twenty', 'Thirty', 'Forty', 'Fifty', 'Sixty', 'Seventy', 'Eighty', 'Ninety']
+
+# largest first
+SCALES = {
+    'international': [(10 ** 12, 'Trillion'), (10 ** 9, 'Billion'), (10 ** 6, 'Million'), (10 ** 3, 'Thousand')],
+    'indian': [(10 ** 7, 'Crore'), (10 ** 5, 'Lakh'), (10 ** 3, 'Thousand')],
 }
 
-def convert_hundred(n):
+CURRENCY = 'Birr'
+SUBUNIT = 'Cents'
+CACHE_SIZE = 4096                                                       # distinct amounts remembered
+
+
+def _below_thousand(n):
     if n < 20:
-        return NUM_NAMES[n]
-    elif n < 100:
-        div, mod = divmod(n, 10)
-        return TENS_NAMES[div] + ('' if mod==0 else ' ' + NUM_NAMES[mod])
-    else:
-        div, mod = divmod(n,100)
-        return NUM_NAMES[div] + ' Hundred' + ('' if mod==0 else ' ' + convert_hundred(mod))
-
-def number_to_words(n):
-    if n==0:
-        return 'Zero'
-    words = ''
-    if n>=1000:
-        div, mod = divmod(n,1000)
-        words += convert_hundred(div) + ' Thousand '
-        n = mod
-    if n>0:
-        words += convert_hundred(n)
-    return words.strip()
-
-@register.filter
-def num2words(value):
+        return ONES[n]
+    if n < 100:
+        tens, ones = divmod(n, 10)
+        return TENS[tens] + (' ' + ONES[ones] if ones else '')
+    hundreds, rest = divmod(n, 100)
+    return ONES[hundreds] + ' Hundred' + (' ' + BELOW_THOUSAND[rest] if rest else '')
+
+
+BELOW_THOUSAND = []
+for _n in range(1000):
+    BELOW_THOUSAND.append(_below_thousand(_n))
+
+
+def _whole(n, scales):
+    if n < 1000:
+        return BELOW_THOUSAND[n]
+    for value, name in scales:
+        if n >= value:
+            high, low = divmod(n, value)
+            words = _whole(high, scales) + ' ' + name
+            return words + ' ' + _whole(low, scales) if low else words
+    raise AssertionError("every scale table ends with Thousand")
+
+
+def number_to_words(n, system='international'):
+    """
+    Words of a whole number: 1234567 -> "One Million Two Hundred Thirty Four Thousand Five Hundred Sixty Seven".
+    Floats and Decimals must be whole (5.0 is fine), anything with a fraction raises ValueError rather than
+    losing it; amount_in_words() spells fractions.
+    """
+    if system not in SCALES:
+        raise ValueError(f"unknown numbering system {system!r}, expected one of {sorted(SCALES)}")
+    if isinstance(n, (float, Decimal)) and (not math.isfinite(n) or n != int(n)):
+        raise ValueError(f"{n!r} is not a whole number")
+    n = int(n)
+    if n < 0:
+        return 'Minus ' + _whole(-n, SCALES[system])
+    return _whole(n, SCALES[system])
+
+
+def _as_decimal(value):
+    # floats go through their shortest repr, so 0.1 is 0.1 and not 0.1000000000000000055...
+    value = Decimal(repr(value)) if isinstance(value, float) else Decimal(value)
+    if not value.is_finite():
+        raise ValueError(f"{value} has no words")
+    return value
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _amount_in_words(value, system, currency, subunit):
+    cents = int((abs(value) * 100).quantize(Decimal(1), ROUND_HALF_UP))
+    whole, fraction = divmod(cents, 100)
+    words = f"{number_to_words(whole, system)} {currency}"
+    if fraction:
+        words += f" and {number_to_words(fraction, system)} {subunit}"
+    return 'Minus ' + words if value < 0 and cents else words
+
+
+def amount_in_words(value, system='international', currency=CURRENCY, subunit=SUBUNIT):
+    """
+    Words of a money amount rounded to the cent: Decimal('1114.38') -> "One Thousand One Hundred Fourteen Birr
+    and Thirty Eight Cents". Accepts Decimal, int, float or a numeric string; Decimals are used exactly.
+    Raises ValueError for anything else.
+    """
     try:
-        value = float(value)
-        whole = int(math.floor(value))
-        fraction = int(round((value-whole)*100))
-        if fraction > 0:
-            return f"{number_to_words(whole)} Birr and {number_to_words(fraction)} Cents"
-        else:
-            return f"{number_to_words(whole)} Birr"
-    except:
-        return ''
+        value = _as_decimal(value)
+    except (InvalidOperation, TypeError) as error:
+        raise ValueError(f"{value!r} is not a number") from error
+    return _amount_in_words(value, system, currency, subunit)
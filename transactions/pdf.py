@@ -0,0 +1,85 @@
+import zlib
+
+
+# a small PDF writer for bills: text in the standard Helvetica/Courier fonts (nothing to embed) and lines,
+# on A4 pages, coordinates in points from the bottom-left corner
+PAGE_WIDTH = 595
+PAGE_HEIGHT = 842
+
+FONTS = {
+    'regular': ('F1', 'Helvetica'),
+    'bold': ('F2', 'Helvetica-Bold'),
+    'mono': ('F3', 'Courier'),
+}
+MONO_ADVANCE = 0.6                                                      # every Courier glyph is 600/1000 em wide
+
+
+def _escape(text):
+    text = str(text).encode('cp1252', 'replace').decode('latin-1')     # WinAnsiEncoding of the standard fonts
+    return text.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)').replace('\r', '').replace('\n', ' ')
+
+
+def mono_width(text, size):
+    """Width in points of 'text' set in Courier, so numbers can be right-aligned"""
+    return len(str(text)) * size * MONO_ADVANCE
+
+
+class PDFDocument:
+    """Pages of text and lines; render() returns the PDF file with deflated page contents"""
+
+    def __init__(self, title=''):
+        self.title = title
+        self.pages = []
+        self.new_page()
+
+    def new_page(self):
+        self.pages.append([])
+
+    def text(self, x, y, text, size=9, font='regular'):
+        name, _ = FONTS[font]
+        self.pages[-1].append(f"BT /{name} {size} Tf {x:.2f} {y:.2f} Td ({_escape(text)}) Tj ET")
+
+    def text_right(self, x, y, text, size=9):
+        """Courier text ending at 'x'"""
+        self.text(x - mono_width(text, size), y, text, size, font='mono')
+
+    def line(self, x1, y1, x2, y2, width=0.5):
+        self.pages[-1].append(f"{width} w {x1:.2f} {y1:.2f} m {x2:.2f} {y2:.2f} l S")
+
+    def render(self):
+        objects = []                                                    # bodies of objects 1..n
+
+        def add(body):
+            objects.append(body)
+            return len(objects)
+
+        catalog = add(None)
+        pages = add(None)
+        fonts = ' '.join(
+            f"/{name} {add(f'<< /Type /Font /Subtype /Type1 /BaseFont /{base} /Encoding /WinAnsiEncoding >>'.encode())} 0 R"
+            for name, base in FONTS.values()
+        )
+        kids = []
+        for operations in self.pages:
+            content = zlib.compress('\n'.join(operations).encode('latin-1'))
+            stream = add(b"<< /Length %d /Filter /FlateDecode >>\nstream\n" % len(content) + content + b"\nendstream")
+            kids.append(add(
+                f"<< /Type /Page /Parent {pages} 0 R /MediaBox [0 0 {PAGE_WIDTH} {PAGE_HEIGHT}] "
+                f"/Resources << /Font << {fonts} >> >> /Contents {stream} 0 R >>".encode()
+            ))
+        objects[catalog - 1] = f"<< /Type /Catalog /Pages {pages} 0 R >>".encode()
+        objects[pages - 1] = f"<< /Type /Pages /Kids [{' '.join(f'{kid} 0 R' for kid in kids)}] /Count {len(kids)} >>".encode()
+        info = add(f"<< /Title ({_escape(self.title)}) /Producer (IMS) >>".encode())
+
+        output = bytearray(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+        offsets = []
+        for number, body in enumerate(objects, 1):
+            offsets.append(len(output))
+            output += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+        xref = len(output)
+        output += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+        output += b''.join(b"%010d 00000 n \n" % offset for offset in offsets)
+        output += b"trailer\n<< /Size %d /Root %d 0 R /Info %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (
+            len(objects) + 1, catalog, info, xref
+        )
+        return bytes(output)
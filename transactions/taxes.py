@@ -0,0 +1,110 @@
+from collections import namedtuple
+from datetime import timedelta
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Sum
+
+from inventory.snapshots import day_start
+from .models import SaleBill, SaleBillDetails, SaleBillTax
+
+
+# Taxes of sale bills, in Decimal and rounded to the cent line by line. The lines come from
+# settings.SALE_TAXES and are stored with the bill when it is made (SaleBillTax, SaleBill.net_payable),
+# so bill pages, prints and reports read them instead of computing them again.
+CENT = Decimal('0.01')
+STORE_BATCH_SIZE = 500
+
+TaxLine = namedtuple('TaxLine', 'code label rate base amount withheld')
+BillTaxes = namedtuple('BillTaxes', 'subtotal lines gross net_payable')       # gross: subtotal plus the added taxes
+
+
+def configured_taxes():
+    """settings.SALE_TAXES with Decimal rates"""
+    return [
+        {'on': 'subtotal', 'withheld': False, **tax, 'rate': Decimal(str(tax['rate']))}
+        for tax in settings.SALE_TAXES
+    ]
+
+
+def compute(subtotal, taxes=None):
+    """
+    BillTaxes of a subtotal. Each tax applies to the subtotal, or with on='running' to the subtotal
+    plus the taxes added before it; withheld taxes are deducted from the amount payable.
+    """
+    taxes = configured_taxes() if taxes is None else taxes
+    subtotal = Decimal(subtotal).quantize(CENT)
+    running = subtotal
+    lines = []
+    for tax in taxes:
+        base = running if tax['on'] == 'running' else subtotal
+        amount = (base * tax['rate']).quantize(CENT, ROUND_HALF_UP)
+        lines.append(TaxLine(tax['code'], tax['label'], tax['rate'], base, amount, tax['withheld']))
+        if not tax['withheld']:
+            running += amount
+    withheld = sum((line.amount for line in lines if line.withheld), Decimal(0))
+    return BillTaxes(subtotal, lines, running, running - withheld)
+
+
+def compute_many(subtotals):
+    """{key: BillTaxes} for {key: subtotal}; the settings are read once and equal subtotals computed once"""
+    taxes = configured_taxes()
+    computed = {}
+    for subtotal in set(subtotals.values()):
+        computed[subtotal] = compute(subtotal, taxes)
+    return {key: computed[subtotal] for key, subtotal in subtotals.items()}
+
+
+def tax_rows(bill, taxes):
+    """Unsaved SaleBillTax rows of a bill's BillTaxes"""
+    return [
+        SaleBillTax(billno=bill, position=position, **line._asdict())
+        for position, line in enumerate(taxes.lines)
+    ]
+
+
+def store_taxes(bills):
+    """
+    (Re)computes and stores the taxes of SaleBill instances in a handful of statements, whatever their number.
+    Their details versions are bumped, so bill documents rendered with the old lines are not served again.
+    """
+    results = compute_many({bill.pk: bill.total_amount for bill in bills})
+    with transaction.atomic():
+        SaleBillTax.objects.filter(billno__in=[bill.pk for bill in bills]).delete()
+        SaleBillTax.objects.bulk_create(
+            (row for bill in bills for row in tax_rows(bill, results[bill.pk])), batch_size=STORE_BATCH_SIZE
+        )
+        for bill in bills:
+            bill.net_payable = results[bill.pk].net_payable
+        SaleBill.objects.bulk_update(bills, ['net_payable'], batch_size=STORE_BATCH_SIZE)
+        SaleBillDetails.objects.filter(billno__in=[bill.pk for bill in bills]).update(version=F('version') + 1)
+
+
+def bill_taxes(bill):
+    """BillTaxes of a sale bill from its stored lines ('taxes' may be prefetched); computed for bills made before they were stored"""
+    if bill.net_payable is None:
+        return compute(bill.total_amount)
+    subtotal = Decimal(bill.total_amount).quantize(CENT)
+    lines = [
+        TaxLine(row.code, row.label, row.rate, row.base, row.amount, row.withheld)
+        for row in bill.taxes.all()
+    ]
+    added = sum((line.amount for line in lines if not line.withheld), Decimal(0))
+    return BillTaxes(subtotal, lines, subtotal + added, bill.net_payable)
+
+
+def tax_summary(start_date, end_date):
+    """Totals per tax over the sale bills of start_date..end_date, summed by the database"""
+    rows = list(
+        SaleBillTax.objects.filter(
+            billno__time__gte=day_start(start_date),
+            billno__time__lt=day_start(end_date + timedelta(days=1)),
+        )
+        .values('code', 'label', 'withheld')
+        .annotate(bills=Count('billno'), base=Sum('base'), amount=Sum('amount'))
+        .order_by('code', 'label', 'withheld')
+    )
+    for row in rows:                                                    # SQLite sums decimals as floats
+        row['base'], row['amount'] = row['base'].quantize(CENT), row['amount'].quantize(CENT)
+    return rows
@@ -0,0 +1,26 @@
+from django import template
+
+from transactions.number_to_words import amount_in_words as _amount_in_words, number_to_words as _number_to_words
+
+
+register = template.Library()
+
+
+# {{ bill.net_payable|amount_in_words }}, or |amount_in_words:"indian" for lakh/crore
+@register.filter
+def amount_in_words(value, system='international'):
+    if value in (None, ''):
+        return ''
+    try:
+        return _amount_in_words(value, system)
+    except ValueError:
+        return ''
+
+
+# whole numbers only, a value with a fraction renders nothing rather than its truncated words
+@register.filter
+def number_in_words(value, system='international'):
+    try:
+        return _number_to_words(value, system)
+    except (TypeError, ValueError):
+        return ''
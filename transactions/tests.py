@@ -1,3 +1,111 @@
-from django.test import TestCase
+import threading
+from datetime import timedelta
 
-# Create your tests here.
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+
+from core.pagination import KeysetPaginator
+from inventory.locations import default_location_id
+from inventory.models import Stock
+from inventory.tests import PAGE_SIZE, QueryPlanMixin
+from .models import Supplier, PurchaseBill, PurchaseItem, SaleBill, SaleItem
+from .views import BILL_KEYSET
+
+
+class BillQueryPlanTests(QueryPlanMixin, TestCase):
+    def setUp(self):
+        self.cursor = [timezone.now() - timedelta(days=30), 1]
+        self.purchases = KeysetPaginator(PurchaseBill.objects.all(), BILL_KEYSET, PAGE_SIZE)
+        self.sales = KeysetPaginator(SaleBill.objects.all(), BILL_KEYSET, PAGE_SIZE)
+
+    def test_purchase_list(self):
+        self.assertUsesIndex(self.purchases.rows_after()[:PAGE_SIZE + 1], 'purchasebill_time_idx')
+        self.assertUsesIndex(self.purchases.rows_after(self.cursor)[:PAGE_SIZE + 1], 'purchasebill_time_idx')
+        self.assertUsesIndex(self.purchases.rows_before(self.cursor)[:PAGE_SIZE + 1], 'purchasebill_time_idx')
+
+    def test_supplier_bills(self):
+        bills = KeysetPaginator(PurchaseBill.objects.filter(supplier_id=1), BILL_KEYSET, PAGE_SIZE)
+        self.assertUsesIndex(bills.rows_after(self.cursor)[:PAGE_SIZE + 1], 'purchasebill_supplier_time_idx')
+
+    def test_sale_list(self):
+        self.assertUsesIndex(self.sales.rows_after()[:PAGE_SIZE + 1], 'salebill_time_idx')
+        self.assertUsesIndex(self.sales.rows_after(self.cursor)[:PAGE_SIZE + 1], 'salebill_time_idx')
+        self.assertUsesIndex(SaleBill.objects.order_by('-time')[:5], 'salebill_time_idx')
+
+    def test_suppliers(self):
+        self.assertUsesIndex(Supplier.objects.filter(name='Supplier'), 'supplier_name_idx')
+        suppliers = KeysetPaginator(Supplier.objects.filter(is_deleted=False), ('name', 'id'), PAGE_SIZE)
+        self.assertUsesIndex(suppliers.rows_after(['m', 1])[:PAGE_SIZE + 1], 'supplier_active_name_idx')
+
+    def test_bills_of_a_stock(self):
+        self.assertUsesIndex(PurchaseItem.objects.filter(stock_id=1).values_list('billno', flat=True), 'purchaseitem_stock_bill_idx')
+        self.assertUsesIndex(SaleItem.objects.filter(stock_id=1).values_list('billno', flat=True), 'saleitem_stock_bill_idx')
+
+
+class ConcurrentSaleTests(TransactionTestCase):
+    """Sales posted from several threads at once must not lose any quantity update nor oversell a location"""
+
+    serialized_rollback = True                  # keeps the default location created by the migrations
+
+    workers = 4
+    sales = 5
+    quantity = 2
+
+    def setUp(self):
+        self.location = default_location_id()
+
+    def post_sales(self, stock):
+        """Posts 'sales' sales from each of 'workers' threads at once, returns the status codes other than 302"""
+        barrier = threading.Barrier(self.workers)
+        failures = []
+
+        # every sale carries two lines of the same stock, which the view has to merge into one update
+        payload = {
+            'name': 'Concurrency Check', 'phone': '0000000000', 'address': '-', 'email': 'check@example.com', 'gstin': '-',
+            'form-TOTAL_FORMS': '2', 'form-INITIAL_FORMS': '0',
+        }
+        for line in range(2):
+            payload.update({
+                f'form-{line}-stock': stock.pk, f'form-{line}-location': self.location,
+                f'form-{line}-quantity': self.quantity, f'form-{line}-perprice': 1,
+            })
+
+        def till():
+            barrier.wait()
+            try:
+                for _ in range(self.sales):
+                    response = self.client_class().post('/transactions/sales/new', payload)
+                    if response.status_code != 302:
+                        failures.append(response.status_code)
+            except Exception as exc:                    # e.g. a lock error, which would otherwise die with the thread
+                failures.append(exc)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=till) for _ in range(self.workers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return failures
+
+    def test_concurrent_sales_keep_quantity_exact(self):
+        stock = Stock.objects.create(name='Concurrency', quantity=self.workers * self.sales * self.quantity * 2)
+        self.assertEqual(self.post_sales(stock), [])
+        self.assertEqual(SaleBill.objects.count(), self.workers * self.sales)
+        stock.refresh_from_db()
+        self.assertEqual(stock.quantity, 0)
+        self.assertEqual(stock.locations.get(location_id=self.location).quantity, 0)
+
+    def test_concurrent_sales_do_not_oversell(self):
+        # enough for half of the sales; the others are turned back with the form, whenever they were validated
+        opening = self.workers * self.sales * self.quantity
+        stock = Stock.objects.create(name='Concurrency', quantity=opening)
+        failures = self.post_sales(stock)
+        posted = SaleBill.objects.count()
+        self.assertEqual(set(failures), {200})
+        self.assertEqual(posted, self.workers * self.sales // 2)
+        stock.refresh_from_db()
+        self.assertEqual(stock.quantity, 0)
+        self.assertEqual(stock.locations.get(location_id=self.location).quantity, 0)
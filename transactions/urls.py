@@ -16,13 +16,21 @@ path('purchases/', views.PurchaseView.as_view(), name='purchases-list'),
 path('purchases/select-supplier/', views.SelectSupplierView.as_view(), name='select-supplier'),  # <-- here
 path('purchases/new/<int:pk>/', views.PurchaseCreateView.as_view(), name='new-purchase'),
 path('purchases/delete/<int:pk>/', views.PurchaseDeleteView.as_view(), name='delete-purchase'),
+path('purchases/bulk-delete/', views.PurchaseBulkDeleteView.as_view(), name='bulk-delete-purchases'),
+path('purchases/export/', views.export_purchases, name='export-purchases'),
+path('purchases/print/', views.print_bills, {'kind': 'purchase'}, name='print-purchases'),
 path('purchases/bill/<int:billno>/', views.PurchaseBillView.as_view(), name='purchase-bill'),
+path('purchases/bill/<int:billno>/pdf/', views.bill_pdf, {'kind': 'purchase'}, name='purchase-bill-pdf'),
 
    
     path('sales/', views.SaleView.as_view(), name='sales-list'),
     path('sales/new', views.SaleCreateView.as_view(), name='new-sale'),
     path('sales/<pk>/delete', views.SaleDeleteView.as_view(), name='delete-sale'),
+    path('sales/bulk-delete/', views.SaleBulkDeleteView.as_view(), name='bulk-delete-sales'),
+    path('sales/export/', views.export_sales, name='export-sales'),
+    path('sales/print/', views.print_bills, {'kind': 'sale'}, name='print-sales'),
     path("purchases/<billno>", views.PurchaseBillView.as_view(), name="purchase-bill"),
     path("sales/<billno>", views.SaleBillView.as_view(), name="sale-bill"),
+    path("sales/<int:billno>/pdf/", views.bill_pdf, {'kind': 'sale'}, name="sale-bill-pdf"),
     
 ]
\ No newline at end of file
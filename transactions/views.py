@@ -1,30 +1,72 @@
+from datetime import timedelta
+
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
 from django.views.generic import View, ListView, CreateView, UpdateView, DeleteView
 from django.contrib.messages.views import SuccessMessageMixin
-from django.core.paginator import Paginator, PageNotAnInteger, EmptyPage
 from django.urls import reverse_lazy
+from django.conf import settings
+from django.http import HttpResponseBadRequest, FileResponse, StreamingHttpResponse
+from django.db import transaction
+from django.db.models import F, Prefetch
+from django.utils.decorators import method_decorator
 
 
 from .models import (
     Supplier, PurchaseBill, PurchaseItem, PurchaseBillDetails,
-    SaleBill, SaleItem, SaleBillDetails
+    SaleBill, SaleItem, SaleBillDetails, SaleBillTax
 )
 from inventory.models import Stock
+from core.pagination import KeysetPaginator, KeysetPaginationMixin
+from core.db_routers import use_replica
+from inventory import ledger, events, locations
+from inventory.movements import quantity_deltas, apply_stock_deltas
+from inventory.exports import EXPORT_CHUNK_SIZE, stream_csv, local_time
+from inventory.reports import parse_date_range
+from inventory.snapshots import day_start
+from . import bill_artifacts, batch_printing, taxes
+from .bill_totals import bill_totals
+from .deletion import delete_purchase_bills, delete_sale_bills
 from .forms import (
     SupplierForm, SelectSupplierForm,
     PurchaseItemFormset, PurchaseDetailsForm,
     SaleForm, SaleItemFormset, SaleDetailsForm
 )
 
+# rows per INSERT when writing the lines of a bill
+BULK_BATCH_SIZE = 500
+# bill listings page on (time, billno), newest first
+BILL_KEYSET = ('-time', '-billno')
+
+
+# listings show every bill's items, stock names and supplier, so fetch them all up front
+def purchase_bills_for_listing():
+    return (
+        PurchaseBill.objects
+        .select_related('supplier')
+        .prefetch_related(Prefetch('purchasebillno', queryset=PurchaseItem.objects.select_related('stock')))
+        .order_by('-time')
+    )
+
+
+def sale_bills_for_listing():
+    return (
+        SaleBill.objects
+        .prefetch_related(Prefetch('salebillno', queryset=SaleItem.objects.select_related('stock')))
+        .order_by('-time')
+    )
+
+
 # ---------- SUPPLIER VIEWS ----------
 
 # List all suppliers
-class SupplierListView(ListView):
+@method_decorator(use_replica, name='dispatch')
+class SupplierListView(KeysetPaginationMixin, ListView):
     model = Supplier
     template_name = "suppliers/suppliers_list.html"
     queryset = Supplier.objects.filter(is_deleted=False)
     paginate_by = 10
+    keyset_ordering = ('name', 'id')
 # ---------- SUPPLIER SELECTION ----------
 class SelectSupplierView(View):
     form_class = SelectSupplierForm
@@ -61,16 +103,12 @@ class SelectSupplierView(View):
         return render(request, self.template_name, {'form': form})
 
 # View supplier details and purchase bills
+@method_decorator(use_replica, name='dispatch')
 class SupplierView(View):
     def get(self, request, name):
         supplier = get_object_or_404(Supplier, name=name)
-        bills = PurchaseBill.objects.filter(supplier=supplier)
-        paginator = Paginator(bills, 10)
-        page = request.GET.get('page', 1)
-        try:
-            paginated = paginator.page(page)
-        except (PageNotAnInteger, EmptyPage):
-            paginated = paginator.page(1)
+        bills = purchase_bills_for_listing().filter(supplier=supplier)
+        paginated = KeysetPaginator(bills, BILL_KEYSET, 10).page(request.GET)
 
         return render(request, 'suppliers/supplier.html', {
             'supplier': supplier,
@@ -147,12 +185,17 @@ class SelectSupplierView(View):
 
 
 # List of all purchase bills
-class PurchaseView(ListView):
+@method_decorator(use_replica, name='dispatch')
+class PurchaseView(KeysetPaginationMixin, ListView):
     model = PurchaseBill
     template_name = "purchases/purchases_list.html"
     context_object_name = 'bills'
     ordering = ['-time']
     paginate_by = 10
+    keyset_ordering = BILL_KEYSET
+
+    def get_queryset(self):
+        return purchase_bills_for_listing()
 
 
 # Create a new purchase bill for a selected supplier
@@ -172,22 +215,27 @@ class PurchaseCreateView(View):
         formset = PurchaseItemFormset(request.POST)
 
         if formset.is_valid():
-            # Create the purchase bill
-            bill = PurchaseBill.objects.create(supplier=supplier)
-            PurchaseBillDetails.objects.create(billno=bill)
-
-            # Process each item in the formset
+            items = []
             for form in formset:
                 item = form.save(commit=False)
-                item.billno = bill
                 item.totalprice = item.perprice * item.quantity
-
-                # Update stock quantity
-                stock = get_object_or_404(Stock, name=item.stock.name)
-                stock.quantity += item.quantity
-                stock.save()
-
-                item.save()
+                items.append(item)
+            total_amount, item_count = bill_totals(items)
+
+            with transaction.atomic():
+                # Create the purchase bill
+                bill = PurchaseBill.objects.create(supplier=supplier, total_amount=total_amount, item_count=item_count)
+                PurchaseBillDetails.objects.create(billno=bill)
+
+                # Insert every line at once, then move the stock in one batched update
+                for item in items:
+                    item.billno = bill
+                PurchaseItem.objects.bulk_create(items, batch_size=BULK_BATCH_SIZE)
+                deltas = quantity_deltas(items)
+                apply_stock_deltas(deltas)
+                locations.record_items(items, locations.PURCHASED)
+                ledger.record_purchase(items)
+                events.stock_moved(deltas, bill.billno, 'purchase')
 
             messages.success(request, "Purchased items registered successfully.")
             return redirect('purchase-bill', billno=bill.billno)
@@ -204,16 +252,20 @@ class PurchaseDeleteView(SuccessMessageMixin, DeleteView):
     template_name = "delete_purchase.html"
     success_url = '/transactions/purchases'
 
-    def delete(self, *args, **kwargs):
-        self.object = self.get_object()
-        # Roll back stock quantities
-        for item in PurchaseItem.objects.filter(billno=self.object.billno):
-            stock = get_object_or_404(Stock, name=item.stock.name)
-            if not stock.is_deleted:
-                stock.quantity -= item.quantity
-                stock.save()
+    # DeleteView.post() goes through form_valid(), so the stock rollback has to live here
+    def form_valid(self, form):
+        delete_purchase_bills(PurchaseBill.objects.filter(pk=self.object.pk))
         messages.success(self.request, "Purchase bill deleted successfully.")
-        return super().delete(*args, **kwargs)
+        return redirect(self.get_success_url())
+
+
+# Delete many purchase bills at once, reversing all their stock movements together
+class PurchaseBulkDeleteView(View):
+    def post(self, request):
+        billnos = [value for value in request.POST.getlist('billno') if value.isdigit()]
+        count = delete_purchase_bills(PurchaseBill.objects.filter(pk__in=billnos))
+        messages.success(request, f"{count} purchase bills deleted successfully.")
+        return redirect('purchases-list')
 
 
 # Display a purchase bill
@@ -222,14 +274,10 @@ class PurchaseBillView(View):
     bill_base = "bill/bill_base.html"
 
     def get(self, request, billno):
-        bill = get_object_or_404(PurchaseBill, billno=billno)
-        items = PurchaseItem.objects.filter(billno=billno)
-        details = get_object_or_404(PurchaseBillDetails, billno=billno)
-
+        details = bill_artifacts.bill_details('purchase', billno)
         return render(request, self.template_name, {
-            'bill': bill,
-            'items': items,
-            'billdetails': details,
+            'bill': details.billno,
+            'document': bill_artifacts.document_html('purchase', details),
             'bill_base': self.bill_base,
         })
 
@@ -239,18 +287,25 @@ class PurchaseBillView(View):
             details = get_object_or_404(PurchaseBillDetails, billno=billno)
             for field, value in form.cleaned_data.items():
                 setattr(details, field, value)
+            details.version = F('version') + 1
             details.save()
+            bill_artifacts.discard('purchase', billno)
             messages.success(request, "Purchase bill updated.")
         return self.get(request, billno)
 
 
 # ---------- SALE VIEWS ----------
-class SaleView(ListView):
+@method_decorator(use_replica, name='dispatch')
+class SaleView(KeysetPaginationMixin, ListView):
     model = SaleBill
     template_name = "sales/sales_list.html"
     context_object_name = 'bills'
     ordering = ['-time']
     paginate_by = 10
+    keyset_ordering = BILL_KEYSET
+
+    def get_queryset(self):
+        return sale_bills_for_listing()
 
 
 class SaleCreateView(View):
@@ -260,27 +315,46 @@ class SaleCreateView(View):
         return render(request, self.template_name, {
             'form': SaleForm(),
             'formset': SaleItemFormset(),
-            'stocks': Stock.objects.filter(is_deleted=False)
         })
 
     def post(self, request):
         form = SaleForm(request.POST)
         formset = SaleItemFormset(request.POST)
         if form.is_valid() and formset.is_valid():
-            bill = form.save()
-            SaleBillDetails.objects.create(billno=bill)
-
-            for form in formset:
-                item = form.save(commit=False)
-                item.billno = bill
+            items = []
+            for item_form in formset:
+                item = item_form.save(commit=False)
                 item.totalprice = item.perprice * item.quantity
-                stock = get_object_or_404(Stock, name=item.stock.name)
-                stock.quantity -= item.quantity
-                stock.save()
-                item.save()
-
-            messages.success(request, "Sale registered successfully.")
-            return redirect('sale-bill', billno=bill.billno)
+                items.append(item)
+
+            try:
+                with transaction.atomic():
+                    bill = form.save(commit=False)
+                    bill.total_amount, bill.item_count = bill_totals(items)
+                    bill_taxes = taxes.compute(bill.total_amount)
+                    bill.net_payable = bill_taxes.net_payable
+                    bill.save()
+                    SaleBillDetails.objects.create(billno=bill)
+                    SaleBillTax.objects.bulk_create(taxes.tax_rows(bill, bill_taxes))
+
+                    for item in items:
+                        item.billno = bill
+                    SaleItem.objects.bulk_create(items, batch_size=BULK_BATCH_SIZE)
+                    # the formset checked the locations before the transaction, the guarded update checks them again
+                    # under its lock, so a concurrent sale cannot take the same quantity
+                    locations.take_items(items)
+                    deltas = quantity_deltas(items, sign=-1)
+                    apply_stock_deltas(deltas)
+
+                    ledger.record_sale(items)
+                    events.stock_moved(deltas, bill.billno, 'sale')
+            except locations.OutOfStock:
+                # rolled back; show what is left now, which another sale may already have put back
+                if not formset.recheck_held():
+                    form.add_error(None, "The stock changed while the sale was saved, please submit it again.")
+            else:
+                messages.success(request, "Sale registered successfully.")
+                return redirect('sale-bill', billno=bill.billno)
 
         return render(request, self.template_name, {
             'form': form,
@@ -293,15 +367,20 @@ class SaleDeleteView(SuccessMessageMixin, DeleteView):
     template_name = "sales/delete_sale.html"
     success_url = '/transactions/sales'
 
-    def delete(self, *args, **kwargs):
-        self.object = self.get_object()
-        for item in SaleItem.objects.filter(billno=self.object.billno):
-            stock = get_object_or_404(Stock, name=item.stock.name)
-            if not stock.is_deleted:
-                stock.quantity += item.quantity
-                stock.save()
+    # DeleteView.post() goes through form_valid(), so the stock rollback has to live here
+    def form_valid(self, form):
+        delete_sale_bills(SaleBill.objects.filter(pk=self.object.pk))
         messages.success(self.request, "Sale bill deleted successfully.")
-        return super().delete(*args, **kwargs)
+        return redirect(self.get_success_url())
+
+
+# Delete many sale bills at once, putting all their stock back together
+class SaleBulkDeleteView(View):
+    def post(self, request):
+        billnos = [value for value in request.POST.getlist('billno') if value.isdigit()]
+        count = delete_sale_bills(SaleBill.objects.filter(pk__in=billnos))
+        messages.success(request, f"{count} sale bills deleted successfully.")
+        return redirect('sales-list')
 
 
 class SaleBillView(View):
@@ -309,34 +388,12 @@ class SaleBillView(View):
     bill_base = "bill/bill_base.html"
 
     def get(self, request, billno):
-        bill = get_object_or_404(SaleBill, billno=billno)
-        items = SaleItem.objects.filter(billno=billno)
-        details = get_object_or_404(SaleBillDetails, billno=billno)
-
-        # --- Calculate totals ---
-        subtotal = sum(item.totalprice for item in items)
-        vat = subtotal * 0.15
-        total_after_vat = subtotal + vat
-        withhold = total_after_vat * 0.03
-        net_payable = total_after_vat - withhold
-
-        # Convert net amount to words
-        net_in_words = num2words(net_payable, lang='en').title()
-
-        context = {
-            'bill': bill,
-            'items': items,
-            'billdetails': details,
+        details = bill_artifacts.bill_details('sale', billno)
+        return render(request, self.template_name, {
+            'bill': details.billno,
+            'document': bill_artifacts.document_html('sale', details),
             'bill_base': self.bill_base,
-            'subtotal': subtotal,
-            'vat': vat,
-            'total_after_vat': total_after_vat,
-            'withhold': withhold,
-            'net_payable': net_payable,
-            'net_in_words': net_in_words,
-        }
-
-        return render(request, self.template_name, context)
+        })
 
     def post(self, request, billno):
         form = SaleDetailsForm(request.POST)
@@ -344,10 +401,23 @@ class SaleBillView(View):
             details = get_object_or_404(SaleBillDetails, billno=billno)
             for field in form.cleaned_data:
                 setattr(details, field, form.cleaned_data[field])
+            details.version = F('version') + 1
             details.save()
+            bill_artifacts.discard('sale', billno)
             messages.success(request, "Sale bill updated.")
         return self.get(request, billno)
 
+
+# PDF of a bill, rendered on the first download of each details version
+def bill_pdf(request, kind, billno):
+    details = bill_artifacts.bill_details(kind, billno)
+    return FileResponse(
+        open(bill_artifacts.document_pdf(kind, details), 'rb'),
+        content_type='application/pdf',
+        filename=f'{kind}-bill-{billno}.pdf',
+    )
+
+
 class SelectSupplierView(View):
     template_name = 'purchases/select_supplier.html'
     form_class = SelectSupplierForm
@@ -362,4 +432,63 @@ class SelectSupplierView(View):
             supplier = form.cleaned_data['supplier']  # This is a Supplier instance
             # Redirect using supplier.pk
             return redirect('new-purchase', pk=supplier.pk)
-        return render(request, self.template_name, {'form': form})
\ No newline at end of file
+        return render(request, self.template_name, {'form': form})
+
+
+# ---------- EXPORTS ----------
+
+# line items of the bills dated in the report's date range, as a lazily evaluated queryset
+def _items_in_range(model, request):
+    start_date, end_date = parse_date_range(request.GET)
+    return model.objects.filter(
+        billno__time__gte=day_start(start_date),
+        billno__time__lt=day_start(end_date + timedelta(days=1)),
+    ).order_by('billno__time', 'billno', 'id')
+
+
+# every bill of a date range in one ZIP (?start_date=&end_date=&format=pdf|html), streamed while it is rendered
+def print_bills(request, kind):
+    extension = request.GET.get('format', 'pdf')
+    if extension not in batch_printing.COMPRESSION:
+        return HttpResponseBadRequest("format must be pdf or html")
+    try:
+        start_date, end_date = parse_date_range(request.GET)
+    except ValueError:
+        return HttpResponseBadRequest("start_date and end_date must be YYYY-MM-DD")
+    response = StreamingHttpResponse(
+        batch_printing.zip_bills(kind, start_date, end_date, extension, workers=settings.BILL_PRINT_WORKERS),
+        content_type='application/zip',
+    )
+    response['Content-Disposition'] = f'attachment; filename="{kind}-bills-{start_date}-{end_date}.zip"'
+    response['X-Bill-Count'] = batch_printing.bills_in_range(kind, start_date, end_date).count()
+    return response
+
+
+def export_purchases(request):
+    try:
+        items = _items_in_range(PurchaseItem, request)
+    except ValueError:
+        return HttpResponseBadRequest("start_date and end_date must be YYYY-MM-DD")
+    rows = (
+        (billno, local_time(time), supplier, stock, quantity, perprice, totalprice)
+        for billno, time, supplier, stock, quantity, perprice, totalprice in items.values_list(
+            'billno', 'billno__time', 'billno__supplier__name', 'stock__name', 'quantity', 'perprice', 'totalprice'
+        ).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    )
+    header = ['billno', 'time', 'supplier', 'stock', 'quantity', 'perprice', 'totalprice']
+    return stream_csv('purchases.csv', header, rows)
+
+
+def export_sales(request):
+    try:
+        items = _items_in_range(SaleItem, request)
+    except ValueError:
+        return HttpResponseBadRequest("start_date and end_date must be YYYY-MM-DD")
+    rows = (
+        (billno, local_time(time), customer, stock, quantity, perprice, totalprice)
+        for billno, time, customer, stock, quantity, perprice, totalprice in items.values_list(
+            'billno', 'billno__time', 'billno__name', 'stock__name', 'quantity', 'perprice', 'totalprice'
+        ).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    )
+    header = ['billno', 'time', 'customer', 'stock', 'quantity', 'perprice', 'totalprice']
+    return stream_csv('sales.csv', header, rows)